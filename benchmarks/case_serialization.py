@@ -0,0 +1,83 @@
+# backend/benchmarks/case_serialization.py
+
+# Compares the old case listing path with tools/serialization.py. The old
+# path formats createdAt by hand per case, then FastAPI runs jsonable_encoder
+# and json.dumps. The new path is cases_to_api plus orjson. Also reports the
+# bytes on the wire and the compression time for identity, gzip and zstd.
+#
+# Usage (from the backend directory): python benchmarks/case_serialization.py [--sizes 1000 5000 10000 50000]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from tools.serialization import cases_to_api, compress, encode_json
+
+def make_cases(count: int):
+    rng = random.Random(0)
+    cases = []
+    for i in range(count):
+        risk = rng.randint(60, 95)
+        cases.append((f"case{i:08d}x{rng.getrandbits(40):010x}", {
+            "patientName": f"Patient {i}",
+            "patientEmail": f"patient{i % 500}@example.com",
+            "dicomFileUrl": f"https://storage.googleapis.com/stenosis-app/dicom_files/{i:08d}.dcm",
+            "status": rng.choice(["pending_junior_review", "pending_senior_review"]),
+            "modelReport": f"Model analysis indicates a low to moderate probability ({risk}%) of stenosis. A routine check by a junior doctor is advised.",
+            "createdAt": DatetimeWithNanoseconds(2025, 1, 1 + i % 28, i % 24, i % 60, i % 60, nanosecond=rng.randrange(10**9)),
+        }))
+    return cases
+
+def legacy(cases):
+    case_list = []
+    for case_id, data in cases:
+        data = dict(data)
+        if 'createdAt' in data and hasattr(data['createdAt'], 'timestamp'):
+            ts = data['createdAt'].timestamp()
+            data['createdAt'] = {'_seconds': int(ts), '_nanoseconds': int((ts - int(ts)) * 1e9)}
+        case_list.append({"id": case_id, **data})
+    # What FastAPI's default JSONResponse does with the returned list
+    return json.dumps(jsonable_encoder(case_list), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def fast(cases):
+    return encode_json(cases_to_api(cases))
+
+def check_same_output(legacy_body: bytes, body: bytes):
+    # The legacy path rounds nanoseconds through a float, so compare everything else
+    old, new = json.loads(legacy_body), json.loads(body)
+    for item in old + new:
+        item["createdAt"].pop("_nanoseconds")
+    assert old == new, "serialized cases differ"
+
+def best_of(func, arg, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+def main(sizes, repeat: int):
+    print(f"{'cases':>7} {'legacy ms':>10} {'orjson ms':>10} {'speedup':>8} {'identity KiB':>13} {'gzip KiB (ms)':>16} {'zstd KiB (ms)':>16}")
+    for size in sizes:
+        cases = make_cases(size)
+        legacy_ms, legacy_body = best_of(legacy, cases, repeat)
+        fast_ms, body = best_of(fast, cases, repeat)
+        check_same_output(legacy_body, body)
+        gzip_ms, gzipped = best_of(lambda b: compress(b, "gzip"), body, repeat)
+        zstd_ms, zstded = best_of(lambda b: compress(b, "zstd"), body, repeat)
+        print(f"{size:>7} {legacy_ms:>10.1f} {fast_ms:>10.1f} {legacy_ms / fast_ms:>7.1f}x {len(body) / 1024:>13.0f}"
+              f" {len(gzipped) / 1024:>8.0f} ({gzip_ms:5.1f}) {len(zstded) / 1024:>8.0f} ({zstd_ms:5.1f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,57 @@
+# backend/benchmarks/checkpoint_overhead.py
+
+# Measures how much the SQLite checkpointer adds to each review workflow
+# run. Firestore, Gmail and Calendar calls are replaced with no-ops so only
+# graph execution and checkpoint writes are timed.
+#
+# Usage (from the backend directory): python benchmarks/checkpoint_overhead.py [--runs 500]
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def time_runs(app, runs: int, decision: str, use_thread: bool):
+    samples = []
+    for i in range(runs):
+        state = {"case_id": f"bench-{decision}-{i}", "decision": decision, "findings": "benchmark", "doctor_role": "senior_doctor"}
+        config = {"configurable": {"thread_id": state["case_id"]}} if use_thread else None
+        start = time.perf_counter()
+        app.invoke(state, config)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples), statistics.quantiles(samples, n=100, method="inclusive")[94]
+
+def main(runs: int):
+    workdir = tempfile.mkdtemp()
+    os.environ["WORKFLOW_CHECKPOINT_DB"] = os.path.join(workdir, "import.sqlite3")
+
+    import graph.nodes as nodes
+    from graph.workflow import build_workflow
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    nodes.print = lambda *args, **kwargs: None
+    nodes.get_patient_email = lambda case_id: "patient@example.com"
+    nodes.update_case_status_in_db = lambda *args, **kwargs: None
+    nodes.dispatch_notification_email = lambda *args, **kwargs: None
+    nodes.dispatch_appointment_event = lambda *args, **kwargs: None
+
+    workflow = build_workflow()
+    plain = workflow.compile()
+    saver = SqliteSaver(sqlite3.connect(os.path.join(workdir, "bench.sqlite3"), check_same_thread=False))
+    checkpointed = workflow.compile(checkpointer=saver)
+
+    print(f"{runs} runs per path, mean / p95 per run in ms")
+    for decision, path in [("confirmed", "notify_and_schedule"), ("rejected", "close + satisfactory email")]:
+        base_mean, base_p95 = time_runs(plain, runs, decision, use_thread=False)
+        ckpt_mean, ckpt_p95 = time_runs(checkpointed, runs, decision, use_thread=True)
+        print(f"  {path:<28} no checkpointer {base_mean:6.2f} / {base_p95:6.2f}"
+              f"   sqlite {ckpt_mean:6.2f} / {ckpt_p95:6.2f}   overhead {ckpt_mean - base_mean:+6.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=500)
+    main(parser.parse_args().runs)
@@ -0,0 +1,185 @@
+# backend/benchmarks/event_loop_blocking.py
+"""
+Drives concurrent GET /cases and GET /my-cases requests through the real
+app (in process, over httpx's ASGI transport) and measures how long the
+event loop stalls while they run. Firestore and Firebase Auth are replaced
+with fakes that take --latency-ms per call; the auth cache is bypassed so
+every request verifies its token and reads the caller's profile.
+
+Two modes are compared:
+  blocking  the old behaviour: Firestore reads and token checks run inline
+            inside the async handlers (data_access.run_blocking calls the
+            function directly, and Firestore calls sleep the thread)
+  async     the current data layer: the asyncio Firestore client and the
+            bounded blocking-I/O pool in data_access.run_blocking
+
+A probe task asks to wake every --probe-ms; event-loop lag is how late it
+wakes up.
+
+Usage (from the backend directory): python benchmarks/event_loop_blocking.py [--requests 400] [--concurrency 50] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CASES_PER_LIST = 20
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str):
+        return self._data.get(field)
+
+class FakeQuery:
+    """
+    Accepts the chained calls data_access._paginate makes and streams a
+    fixed page of cases after one simulated round trip.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def where(self, *args, **kwargs):
+        return self
+
+    order_by = select = start_after = limit = where
+
+    async def stream(self):
+        await self.backend.round_trip()
+        now = datetime.now(timezone.utc)
+        for i in range(CASES_PER_LIST + 1):
+            yield FakeSnapshot(f"case-{i}", {
+                "patientName": f"Patient {i}",
+                "patientEmail": "patient@example.com",
+                "status": "pending_junior_review",
+                "createdAt": now - timedelta(minutes=i),
+            })
+
+class FakeDocument:
+    def __init__(self, backend, doc_id: str):
+        self.backend = backend
+        self.doc_id = doc_id
+
+    async def get(self):
+        await self.backend.round_trip()
+        # Callers are named after their role, e.g. "junior_doctor-17"
+        role = self.doc_id.split("-", 1)[0]
+        return FakeSnapshot(self.doc_id, {"name": self.doc_id, "email": "patient@example.com", "role": role})
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id: str):
+        return FakeDocument(self.backend, doc_id)
+
+class FakeAsyncFirestore:
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def round_trip(self):
+        if self.blocking:
+            # A synchronous client called from a coroutine holds the loop for the whole call
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    def collection(self, name: str):
+        return FakeCollection(self)
+
+async def run_inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+async def probe_lag(interval: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+async def run_mode(app, data_access, pooled_run_blocking, mode: str, args) -> dict:
+    latency = args.latency_ms / 1000
+    data_access.get_async_db = lambda: FakeAsyncFirestore(latency, blocking=mode == "blocking")
+    data_access.run_blocking = run_inline if mode == "blocking" else pooled_run_blocking
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    durations = []
+    errors = 0
+
+    async def one_request(client, i: int):
+        nonlocal errors
+        # A new caller per request so every one verifies a token and reads a profile
+        path, role = ("/cases", "junior_doctor") if i % 2 else ("/my-cases", "patient")
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Authorization": f"Bearer {role}-{mode}-{i}"})
+            durations.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(args.probe_ms / 1000, lags, stop))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request(client, i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "rps": args.requests / elapsed,
+        "errors": errors,
+        "p95": statistics.quantiles(durations, n=100, method="inclusive")[94],
+        "lag_p50": statistics.median(lags) if lags else 0.0,
+        "lag_p99": statistics.quantiles(lags, n=100, method="inclusive")[98] if len(lags) > 1 else max(lags, default=0.0),
+        "lag_max": max(lags, default=0.0),
+    }
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix="stenosis-loop-")
+    os.environ.update({
+        "REVIEW_QUEUE_DB": os.path.join(workdir, "review_jobs.sqlite3"),
+        "WORKFLOW_CHECKPOINT_DB": os.path.join(workdir, "workflow_checkpoints.sqlite3"),
+        "SHARED_STATE_DB": os.path.join(workdir, "shared_state.sqlite3"),
+    })
+    import main as backend
+    from tools import data_access
+
+    def verify_id_token(token):
+        # Firebase Auth is a blocking HTTP call in the Admin SDK
+        time.sleep(args.latency_ms / 1000)
+        return {"uid": token, "email": "patient@example.com"}
+
+    backend.auth.verify_id_token = verify_id_token
+    backend.auth_cache.get_token = lambda token: None
+    backend.auth_cache.get_user = lambda uid: None
+    backend.worklist.page = lambda *args, **kwargs: None
+    pooled_run_blocking = data_access.run_blocking
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency_ms:.0f} ms per Firestore/Auth call")
+    print(f"  {'mode':<10} {'req/s':>8} {'errors':>7} {'p95 ms':>8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    for mode in ("blocking", "async"):
+        stats = await run_mode(backend.app, data_access, pooled_run_blocking, mode, args)
+        print(f"  {mode:<10} {stats['rps']:>8.1f} {stats['errors']:>7} {stats['p95']:>8.1f}"
+              f" {stats['lag_p50']:>8.1f} {stats['lag_p99']:>8.1f} {stats['lag_max']:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--probe-ms", type=float, default=5, help="how often the lag probe asks to wake up")
+    asyncio.run(main(parser.parse_args()))
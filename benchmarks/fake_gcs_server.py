@@ -0,0 +1,213 @@
+# backend/benchmarks/fake_gcs_server.py
+
+# A minimal stand-in for the GCS JSON API, enough for resumable uploads,
+# object metadata and ACL lookups, and deletes. Uploaded bytes are checksummed and counted but not
+# kept, so the server's own memory stays flat during large upload runs.
+# Set STORAGE_EMULATOR_HOST=http://127.0.0.1:<port> to point the backend at it.
+#
+# Usage: python benchmarks/fake_gcs_server.py [--port 4443] [--latency-ms 0] [--fail-rate 0.0]
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import google_crc32c
+
+class FakeGCSState:
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.sessions = {}
+        self.objects = {}
+        self.lock = threading.Lock()
+
+def _resource(bucket: str, name: str, size: int, crc: int, content_type: str) -> dict:
+    return {
+        "kind": "storage#object",
+        "bucket": bucket,
+        "name": name,
+        "size": str(size),
+        "contentType": content_type,
+        "crc32c": base64.b64encode(crc.to_bytes(4, "big")).decode(),
+    }
+
+def _error(code: int, message: str) -> dict:
+    # Same shape as the real API, which google-api-core parses on failures
+    return {"error": {"code": code, "message": message, "errors": [{"message": message}]}}
+
+_OBJECT_PATH = r"/storage/v1/b/([^/]+)/o/(.+)"
+_ACL_PATH = r"/storage/v1/b/([^/]+)/o/([^/]+)/acl(?:/([^/]+))?"
+
+def make_handler(state: FakeGCSState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: dict = None, headers: dict = None):
+            payload = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _fail(self, status: int, message: str):
+            self._reply(status, _error(status, message))
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _object_key(self, match):
+            return unquote(match.group(1)), unquote(match.group(2))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            match = re.fullmatch(r"/upload/storage/v1/b/([^/]+)/o", url.path)
+            query = parse_qs(url.query)
+            body = self._read_body()
+            if not match or query.get("uploadType") != ["resumable"]:
+                return self._fail(404, "not found")
+            metadata = json.loads(body or b"{}")
+            session_id = uuid.uuid4().hex
+            with state.lock:
+                state.sessions[session_id] = {
+                    "bucket": unquote(match.group(1)),
+                    "name": query.get("name", [metadata.get("name")])[0],
+                    "contentType": metadata.get("contentType", "application/octet-stream"),
+                    "offset": 0,
+                    "crc": 0,
+                    "done": None,
+                }
+            host = self.headers.get("Host")
+            self._reply(200, {}, {"Location": f"http://{host}/upload/sessions/{session_id}"})
+
+        def do_PUT(self):
+            match = re.fullmatch(r"/upload/sessions/([0-9a-f]+)", urlparse(self.path).path)
+            data = self._read_body()
+            session = state.sessions.get(match.group(1)) if match else None
+            if session is None:
+                return self._fail(404, "no such session")
+            if state.latency:
+                time.sleep(state.latency)
+            if session["done"] is not None:
+                return self._reply(200, session["done"])
+            if data and state.fail_rate and random.random() < state.fail_rate:
+                return self._fail(503, "injected failure")
+
+            range_match = re.fullmatch(r"bytes (\*|(\d+)-(\d+))/(\*|\d+)", self.headers.get("Content-Range", ""))
+            if not range_match:
+                return self._fail(400, "bad Content-Range")
+            if range_match.group(2) is not None:
+                start = int(range_match.group(2))
+                if start != session["offset"]:
+                    return self._fail(400, f"expected offset {session['offset']}, got {start}")
+                session["crc"] = google_crc32c.extend(session["crc"], data)
+                session["offset"] += len(data)
+            total = range_match.group(4)
+            if total != "*" and int(total) == session["offset"]:
+                resource = _resource(session["bucket"], session["name"], session["offset"], session["crc"], session["contentType"])
+                expected = self.headers.get("X-Goog-Hash", "")
+                if expected.startswith("crc32c=") and expected[len("crc32c="):] != resource["crc32c"]:
+                    return self._fail(400, "crc32c mismatch")
+                session["done"] = resource
+                with state.lock:
+                    state.objects[(resource["bucket"], resource["name"])] = resource
+                return self._reply(200, resource)
+            headers = {"Range": f"bytes=0-{session['offset'] - 1}"} if session["offset"] else {}
+            self._reply(308, None, headers)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            acl_match = re.fullmatch(_ACL_PATH, path)
+            if acl_match:
+                # blob.make_public() loads the current ACL before patching it
+                resource = state.objects.get(self._object_key(acl_match))
+                if resource is None:
+                    return self._fail(404, "not found")
+                entries = resource.get("acl", [])
+                if acl_match.group(3) is None:
+                    return self._reply(200, {"kind": "storage#objectAccessControls", "items": entries})
+                entry = next((e for e in entries if e.get("entity") == unquote(acl_match.group(3))), None)
+                if entry is None:
+                    return self._fail(404, "no such ACL entry")
+                return self._reply(200, entry)
+            match = re.fullmatch(_OBJECT_PATH, path)
+            resource = state.objects.get(self._object_key(match)) if match else None
+            if resource is None:
+                return self._fail(404, "not found")
+            self._reply(200, resource)
+
+        def do_PATCH(self):
+            # Metadata and ACL updates, e.g. blob.make_public() from POST /cases
+            path = urlparse(self.path).path
+            patch = json.loads(self._read_body() or b"{}")
+            acl_match = re.fullmatch(_ACL_PATH, path)
+            if acl_match:
+                if acl_match.group(3) is None:
+                    return self._fail(400, "ACL patch needs an entity")
+                entity = unquote(acl_match.group(3))
+                with state.lock:
+                    resource = state.objects.get(self._object_key(acl_match))
+                    if resource is not None:
+                        entry = {"kind": "storage#objectAccessControl", "entity": entity, "role": patch.get("role")}
+                        resource["acl"] = [e for e in resource.get("acl", []) if e.get("entity") != entity] + [entry]
+                if resource is None:
+                    return self._fail(404, "not found")
+                return self._reply(200, entry)
+            match = re.fullmatch(_OBJECT_PATH, path)
+            with state.lock:
+                resource = state.objects.get(self._object_key(match)) if match else None
+                if resource is not None:
+                    resource.update(patch)
+            if resource is None:
+                return self._fail(404, "not found")
+            self._reply(200, resource)
+
+        def do_DELETE(self):
+            path = urlparse(self.path).path
+            session_match = re.fullmatch(r"/upload/sessions/([0-9a-f]+)", path)
+            if session_match:
+                with state.lock:
+                    session = state.sessions.pop(session_match.group(1), None)
+                if session is None:
+                    return self._fail(404, "no such session")
+                # GCS answers a cancelled session with 499
+                return self._reply(499, None)
+            match = re.fullmatch(_OBJECT_PATH, path)
+            with state.lock:
+                resource = state.objects.pop(self._object_key(match), None) if match else None
+            if resource is None:
+                return self._fail(404, "not found")
+            self._reply(204, None)
+
+    return Handler
+
+def start_fake_gcs(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+    """
+    Starts the server on a background thread and returns (server, base_url).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeGCSState(latency, fail_rate)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=4443)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_fake_gcs(args.port, args.latency_ms / 1000, args.fail_rate)
+    print(f"Fake GCS listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,112 @@
+# backend/benchmarks/fake_google_apis.py
+
+# A minimal stand-in for the Gmail and Calendar APIs: single sends and event
+# inserts, plus the /batch endpoints the notification dispatcher uses.
+# Every call (or batch) waits `latency` seconds, and `fail_rate` of the calls
+# get a 503 so the retry paths are exercised. Sent messages are counted.
+# Set GOOGLE_API_ROOT_URL=http://127.0.0.1:<port> to point the backend at it.
+#
+# Usage: python benchmarks/fake_google_apis.py [--port 8089] [--latency-ms 50] [--fail-rate 0.0]
+import argparse
+import email
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeGoogleState:
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.counts = {"gmail": 0, "calendar": 0, "batches": 0, "failed": 0}
+        self.lock = threading.Lock()
+
+def _call(state: FakeGoogleState, method: str, path: str):
+    """
+    Returns (status, body) for one Gmail or Calendar call.
+    """
+    if state.fail_rate and random.random() < state.fail_rate:
+        with state.lock:
+            state.counts["failed"] += 1
+        return 503, {"error": {"code": 503, "message": "injected failure"}}
+    if method == "POST" and re.fullmatch(r"/gmail/v1/users/[^/]+/messages/send", path):
+        with state.lock:
+            state.counts["gmail"] += 1
+        return 200, {"id": uuid.uuid4().hex[:16], "labelIds": ["SENT"]}
+    if method == "POST" and re.fullmatch(r"/calendar/v3/calendars/[^/]+/events", path):
+        with state.lock:
+            state.counts["calendar"] += 1
+        event_id = uuid.uuid4().hex
+        return 200, {"id": event_id, "status": "confirmed", "htmlLink": f"https://calendar.example/{event_id}"}
+    return 404, {"error": {"code": 404, "message": f"no route for {method} {path}"}}
+
+def make_handler(state: FakeGoogleState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, payload: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            path = self.path.split("?")[0]
+            if state.latency:
+                time.sleep(state.latency)
+            if path == "/batch" or path.startswith("/batch/"):
+                return self._batch(body)
+            status, result = _call(state, "POST", path)
+            self._reply(status, json.dumps(result).encode(), "application/json")
+
+        def _batch(self, body: bytes):
+            with state.lock:
+                state.counts["batches"] += 1
+            content_type = self.headers.get("Content-Type", "")
+            message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+            boundary = f"batch_{uuid.uuid4().hex}"
+            parts = []
+            for part in message.get_payload():
+                request_line = part.get_payload().lstrip().split("\n", 1)[0]
+                method, target, _ = request_line.split(" ", 2)
+                status, result = _call(state, method, target.split("?")[0])
+                content_id = part["Content-ID"].strip("<>")
+                parts.append(
+                    f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                    f"{json.dumps(result)}\r\n"
+                )
+            payload = ("".join(parts) + f"--{boundary}--\r\n").encode()
+            self._reply(200, payload, f"multipart/mixed; boundary={boundary}")
+
+    return Handler
+
+def start_fake_google_apis(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+    """
+    Starts the server on a background thread and returns (server, state, base_url).
+    """
+    state = FakeGoogleState(latency, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _, url = start_fake_google_apis(args.port, args.latency_ms / 1000, args.fail_rate)
+    print(f"Fake Gmail/Calendar APIs listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
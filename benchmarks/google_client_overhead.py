@@ -0,0 +1,70 @@
+# backend/benchmarks/google_client_overhead.py
+
+# Measures the client-side setup cost paid for every Gmail/Calendar
+# notification: the old path re-read token.json and ran discovery `build`
+# on each call, the registry reuses in-memory credentials and cached
+# service objects. No API requests are sent.
+#
+# Usage (from the backend directory): python benchmarks/google_client_overhead.py [--iterations 200]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def write_fake_token(directory: str):
+    expiry = (datetime.utcnow() + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    token = {
+        "token": "benchmark-access-token",
+        "refresh_token": "benchmark-refresh-token",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "client_id": "benchmark",
+        "client_secret": "benchmark",
+        "scopes": ["https://www.googleapis.com/auth/gmail.send", "https://www.googleapis.com/auth/calendar.events"],
+        "expiry": expiry,
+    }
+    with open(os.path.join(directory, "token.json"), "w") as f:
+        json.dump(token, f)
+
+def per_call_ms(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def main(iterations: int):
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+    from tools.gcp_auth import SCOPES
+    from tools.google_clients import get_service
+
+    with tempfile.TemporaryDirectory() as workdir:
+        write_fake_token(workdir)
+        os.chdir(workdir)
+
+        def rebuild_per_call():
+            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+            build("gmail", "v1", credentials=creds)
+            build("calendar", "v3", credentials=creds)
+
+        def cached_registry():
+            get_service("gmail", "v1")
+            get_service("calendar", "v3")
+
+        cached_registry()  # warm the discovery documents once, as the first notification would
+        before = per_call_ms(rebuild_per_call, iterations)
+        after = per_call_ms(cached_registry, iterations)
+
+    print(f"Per-notification client setup over {iterations} iterations (gmail + calendar):")
+    print(f"  token.json + build per call   {before:8.3f} ms")
+    print(f"  cached registry               {after:8.3f} ms")
+    print(f"  speedup                       {before / after:8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args().iterations)
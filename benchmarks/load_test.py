@@ -0,0 +1,301 @@
+# backend/benchmarks/load_test.py
+
+# Boots the app with uvicorn against the Firestore and Auth emulators, the
+# fake GCS server and the fake Gmail/Calendar APIs. It seeds users and cases,
+# then drives a weighted mix of GET /cases, GET /my-cases,
+# PUT /cases/{id}/review and POST /cases uploads at rising concurrency.
+# Reports p50/p95/p99 latency, throughput and errors per operation. With
+# --compare it exits non-zero when p95 or throughput regress beyond
+# --tolerance against a previous --output file.
+#
+# Start the emulators first (firebase emulators:start --only firestore,auth) and export
+# FIRESTORE_EMULATOR_HOST and FIREBASE_AUTH_EMULATOR_HOST.
+# Usage (from the backend directory): python benchmarks/load_test.py [--concurrency 1 4 16 64] [--duration 20] [--workers 4]
+#     [--mix cases=40,my_cases=30,review=20,upload=10] [--google-latency-ms 50] [--output run.json] [--compare baseline.json]
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_MIX = "cases=40,my_cases=30,review=20,upload=10"
+PATIENTS = 50
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def id_token(uid: str, project_id: str) -> str:
+    """
+    An unsigned ID token; the Admin SDK skips signature checks when
+    FIREBASE_AUTH_EMULATOR_HOST is set but still checks the claims.
+    """
+    def segment(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{project_id}",
+        "aud": project_id,
+        "sub": uid,
+        "user_id": uid,
+        "iat": now,
+        "auth_time": now,
+        "exp": now + 3600,
+    }
+    return f"{segment({'alg': 'none', 'typ': 'JWT'})}.{segment(claims)}."
+
+def seed(case_count: int):
+    """
+    Writes the users and a backlog of cases, and returns the tokens to use.
+    """
+    import firebase_admin
+    from firebase_admin import firestore
+    from tools.emulators import EmulatorCredential, EMULATOR_PROJECT_ID
+
+    firebase_admin.initialize_app(EmulatorCredential(), {"projectId": EMULATOR_PROJECT_ID})
+    db = firestore.client()
+    run = time.strftime("%Y%m%d%H%M%S")
+    users = {
+        "clinic": [(f"load-clinic-{run}", {"role": "clinic", "name": "Load Test Clinic", "email": "clinic@example.com"})],
+        "junior_doctor": [(f"load-junior-{run}", {"role": "junior_doctor", "name": "Dr. Junior", "email": "junior@example.com"})],
+        "senior_doctor": [(f"load-senior-{run}", {"role": "senior_doctor", "name": "Dr. Senior", "email": "senior@example.com"})],
+        "patient": [(f"load-patient-{run}-{i}", {"role": "patient", "name": f"Patient {i}", "email": f"load-{run}-{i}@example.com"})
+                    for i in range(PATIENTS)],
+    }
+    writer = db.bulk_writer()
+    for role_users in users.values():
+        for uid, profile in role_users:
+            writer.set(db.collection("users").document(uid), profile)
+    base = datetime.now(timezone.utc) - timedelta(days=1)
+    rng = random.Random(0)
+    for i in range(case_count):
+        writer.set(db.collection("cases").document(f"load-{run}-{i:06d}"), {
+            "patientName": f"Patient {i % PATIENTS}",
+            "patientEmail": f"load-{run}-{i % PATIENTS}@example.com",
+            "dicomFileUrl": f"https://storage.googleapis.com/load-test/dicom_files/{i:06d}.dcm",
+            "status": "pending_junior_review",
+            "modelReport": "Seeded by benchmarks/load_test.py",
+            "createdAt": base + timedelta(seconds=rng.randint(0, 86400)),
+            "updatedAt": base,
+        })
+    writer.close()
+    tokens = {role: [id_token(uid, EMULATOR_PROJECT_ID) for uid, _ in role_users] for role, role_users in users.items()}
+    case_ids = [f"load-{run}-{i:06d}" for i in range(case_count)]
+    return tokens, case_ids
+
+def start_app(port: int, env: dict, log_path: str, workers: int = 1):
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The app exited during startup; see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit(f"The app did not start within 60 s; see {log_path}")
+
+class Workload:
+    """
+    Picks operations by weight and issues them as the matching user.
+    Each review takes a fresh case so the review workers do real work.
+    """
+
+    def __init__(self, tokens: dict, case_ids: list, mix: dict, upload_bytes: int):
+        self.tokens = tokens
+        self.review_cases = list(case_ids)
+        random.shuffle(self.review_cases)
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.upload = os.urandom(upload_bytes)
+
+    def _auth(self, role: str) -> dict:
+        return {"Authorization": f"Bearer {random.choice(self.tokens[role])}", "Accept-Encoding": "gzip"}
+
+    async def run(self, client: httpx.AsyncClient, operation: str) -> httpx.Response:
+        if operation == "cases":
+            role = random.choice(["junior_doctor", "senior_doctor"])
+            return await client.get("/cases", params={"page_size": 25}, headers=self._auth(role))
+        if operation == "my_cases":
+            return await client.get("/my-cases", params={"page_size": 25}, headers=self._auth("patient"))
+        if operation == "review":
+            case_id = self.review_cases.pop() if self.review_cases else "missing-case"
+            body = {"decision": random.choice(["confirmed", "rejected"]), "findings": "Load test review"}
+            return await client.put(f"/cases/{case_id}/review", json=body, headers=self._auth("junior_doctor"))
+        if operation == "upload":
+            patient = random.randrange(PATIENTS)
+            return await client.post(
+                "/cases",
+                data={"patientName": f"Upload {patient}", "patientEmail": f"upload-{patient}@example.com"},
+                files={"file": ("scan.dcm", self.upload, "application/dicom")},
+                headers=self._auth("clinic"),
+            )
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def pick(self) -> str:
+        return random.choices(self.operations, self.weights)[0]
+
+def percentile(values: list, pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+async def run_level(base_url: str, workload: Workload, concurrency: int, duration: float) -> dict:
+    latencies = {name: [] for name in workload.operations}
+    errors = {name: 0 for name in workload.operations}
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                operation = workload.pick()
+                start = time.perf_counter()
+                try:
+                    response = await workload.run(client, operation)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies[operation].append((time.perf_counter() - start) * 1000)
+                else:
+                    errors[operation] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        name: {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": len(values) / elapsed,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        for name, values in latencies.items()
+    }
+
+def print_level(concurrency: int, results: dict):
+    print(f"\nconcurrency {concurrency}")
+    print(f"  {'operation':<10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in results.items():
+        print(f"  {name:<10} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>8.1f}"
+              f" {stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}")
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """
+    Returns the regressions: p95 more than `tolerance` slower, or
+    throughput more than `tolerance` lower, for the same concurrency.
+    """
+    regressions = []
+    for level, operations in current.items():
+        for name, stats in operations.items():
+            before = baseline.get(level, {}).get(name)
+            if not before or not before["requests"] or not stats["requests"]:
+                continue
+            if stats["p95"] > before["p95"] * (1 + tolerance):
+                regressions.append(f"{name} @ {level}: p95 {before['p95']:.1f} -> {stats['p95']:.1f} ms")
+            if stats["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(f"{name} @ {level}: {before['rps']:.1f} -> {stats['rps']:.1f} req/s")
+    return regressions
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+def main(args):
+    for var in ("FIRESTORE_EMULATOR_HOST", "FIREBASE_AUTH_EMULATOR_HOST"):
+        if not os.getenv(var):
+            sys.exit(f"Set {var} to the running emulator.")
+    from benchmarks.fake_gcs_server import start_fake_gcs
+    from benchmarks.fake_google_apis import start_fake_google_apis
+
+    _, gcs_url = start_fake_gcs(latency=args.gcs_latency_ms / 1000)
+    _, google_state, google_url = start_fake_google_apis(latency=args.google_latency_ms / 1000, fail_rate=args.google_fail_rate)
+    tokens, case_ids = seed(args.cases)
+    print(f"Seeded {args.cases} cases; fake GCS at {gcs_url}, fake Google APIs at {google_url}")
+
+    workdir = tempfile.mkdtemp(prefix="stenosis-load-")
+    env = {
+        **os.environ,
+        "STORAGE_EMULATOR_HOST": gcs_url,
+        "GOOGLE_API_ROOT_URL": google_url,
+        "FIREBASE_STORAGE_BUCKET": "load-test",
+        "REVIEW_QUEUE_DB": os.path.join(workdir, "review_jobs.sqlite3"),
+        "WORKFLOW_CHECKPOINT_DB": os.path.join(workdir, "workflow_checkpoints.sqlite3"),
+        "SHARED_STATE_DB": os.path.join(workdir, "shared_state.sqlite3"),
+        # The harness drives a single clinic far harder than any real one
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+    }
+    port = free_port()
+    log_path = os.path.join(workdir, "app.log")
+    process = start_app(port, env, log_path, args.workers)
+    print(f"App running on port {port} with {args.workers} worker(s); log at {log_path}")
+
+    workload = Workload(tokens, case_ids, parse_mix(args.mix), args.upload_kb * 1024)
+    results = {}
+    try:
+        for concurrency in args.concurrency:
+            level = asyncio.run(run_level(f"http://127.0.0.1:{port}", workload, concurrency, args.duration))
+            results[str(concurrency)] = level
+            print_level(concurrency, level)
+    finally:
+        process.terminate()
+        process.wait(10)
+    print(f"\nGoogle API calls: {google_state.counts}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--upload-kb", type=int, default=512)
+    parser.add_argument("--gcs-latency-ms", type=float, default=20)
+    parser.add_argument("--google-latency-ms", type=float, default=50)
+    parser.add_argument("--google-fail-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-clinic rate limits on")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    main(parser.parse_args())
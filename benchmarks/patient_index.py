@@ -0,0 +1,124 @@
+# backend/benchmarks/patient_index.py
+
+# Measures tools/patient_index.py against the old GET /patients path, which
+# read every patient and filtered in Python. For each size it reports the
+# time to build the index from a first snapshot, the memory used per 100k
+# patients (tracemalloc), and the mean time for:
+# - a first page and a deep page;
+# - the first page of prefix searches of 1 to 3 characters;
+# - a single /register update;
+# - a full scan-and-filter pass like the old path.
+# It also checks every search against a brute-force filter.
+#
+# Usage (from the backend directory): python benchmarks/patient_index.py [--sizes 10000 100000 300000] [--page-size 100]
+import argparse
+import gc
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.patient_index import PatientIndex
+
+FIRST_NAMES = ["Amina", "Bruno", "Chen", "Dalia", "Émile", "Fatima", "Goran", "Hana", "Ivan", "José", "Kai", "Lena",
+               "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tariq", "Uma", "Viktor", "Wen", "Yara", "Zoe"]
+
+class FakeDoc:
+    """
+    A snapshot document that returns new strings on every read, like the
+    Firestore client does, so the index's memory includes its own strings.
+    """
+
+    def __init__(self, doc_id: str, data: dict):
+        self._id = doc_id.encode()
+        self._data = {key: value.encode() for key, value in data.items()}
+
+    @property
+    def id(self):
+        return self._id.decode()
+
+    def to_dict(self):
+        return {key: value.decode() for key, value in self._data.items()}
+
+def make_users(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).capitalize()
+        users.append(FakeDoc("".join(rng.choices(string.ascii_letters + string.digits, k=28)), {
+            "role": "patient",
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+        }))
+    return users
+
+def mean_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def brute_force(users, prefix: str):
+    # Search results are ordered by the matching folded name, else email
+    prefix = prefix.casefold()
+    matches = []
+    for user in users:
+        data = user.to_dict()
+        for field in ("name", "email"):
+            if data[field].casefold().startswith(prefix):
+                matches.append((data[field].casefold(), user.id))
+                break
+    return [uid for _, uid in sorted(matches)]
+
+def all_search_results(index: PatientIndex, prefix: str, page_size: int):
+    uids, token = [], None
+    while True:
+        page, token = index.page(page_size, token, prefix)
+        uids.extend(p["uid"] for p in page)
+        if not token:
+            return uids
+
+def main(sizes, page_size: int):
+    print(f"{'patients':>9} {'build ms':>9} {'MiB/100k':>9} {'page 1':>8} {'deep':>8} {'q=1ch':>8} {'q=2ch':>8} {'q=3ch':>8}"
+          f" {'update':>8} {'scan':>8}   (ms)")
+    for size in sizes:
+        users = make_users(size)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        index = PatientIndex()
+        start = time.perf_counter()
+        index._on_snapshot(users, [], first=True)
+        build_ms = (time.perf_counter() - start) * 1000
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        deep_token = index.page(page_size, None)[1]
+        for _ in range(size // page_size // 2):
+            deep_token = index.page(page_size, deep_token)[1]
+        timings = [
+            mean_ms(lambda: index.page(page_size), 200),
+            mean_ms(lambda: index.page(page_size, deep_token), 200),
+        ]
+        for prefix in ("m", "ma", "mat"):
+            assert all_search_results(index, prefix, page_size) == brute_force(users, prefix), f"search {prefix!r} differs"
+            timings.append(mean_ms(lambda: index.page(page_size, None, prefix), 20))
+        counter = iter(range(10**9))
+        timings.append(mean_ms(lambda: index.apply(f"new-{next(counter)}", {"role": "patient", "name": "Mateo New", "email": "m@example.com"}), 200))
+        # The old path: every patient document read, filtered and returned
+        timings.append(mean_ms(lambda: [{"uid": u.id, **data} for u in users for data in [u.to_dict()] if "name" in data and "email" in data], 3))
+
+        print(f"{size:>9} {build_ms:>9.0f} {used / 2**20 * 100000 / size:>9.1f}" + "".join(f" {t:>8.3f}" for t in timings))
+    print("✅ Prefix searches match a brute-force filter")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.sizes, args.page_size)
@@ -0,0 +1,77 @@
+# backend/benchmarks/preprocessing.py
+
+# Generates synthetic multi-frame angiography DICOM files and runs them
+# through inference/preprocessing.py, reporting per-stage timings, peak
+# traced memory and process RSS so worker nodes can be sized. Pass real
+# studies with --files to measure those instead.
+#
+# Usage (from the backend directory): python benchmarks/preprocessing.py [--frames 30 120] [--size 512 1024] [--files a.dcm b.dcm]
+import argparse
+import os
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, XRayAngiographicImageStorage, generate_uid
+
+def write_synthetic_study(path: str, frames: int, size: int):
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = XRayAngiographicImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = XRayAngiographicImageStorage
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "XA"
+    ds.Rows = size
+    ds.Columns = size
+    ds.NumberOfFrames = frames
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    ds.WindowCenter = 2048
+    ds.WindowWidth = 4096
+    rng = np.random.default_rng(0)
+    ds.PixelData = rng.integers(0, 4096, size=(frames, size, size), dtype=np.uint16).tobytes()
+    ds.save_as(path, enforce_file_format=True)
+
+def report(label: str, path: str):
+    from inference.preprocessing import preprocess_dicom
+
+    pixels, stats = preprocess_dicom(path, trace_memory=True)
+    file_mb = os.path.getsize(path) / 2**20
+    stages = "  ".join(f"{key[:-3]} {value:7.1f}" for key, value in stats.items() if key.endswith("_ms") and key != "total_ms")
+    print(f"{label:<22} {file_mb:8.1f} MiB  total {stats['total_ms']:8.1f} ms  [{stages}]"
+          f"  peak {stats['peak_bytes'] / 2**20:7.1f} MiB  mmap={stats['memory_mapped']}  out={pixels.shape}")
+
+def main(frame_counts, sizes, files):
+    print("Stage timings in ms; peak is the largest traced NumPy/Python allocation.")
+    if files:
+        for path in files:
+            report(os.path.basename(path), path)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            for frames in frame_counts:
+                for size in sizes:
+                    path = os.path.join(workdir, f"study-{frames}x{size}.dcm")
+                    write_synthetic_study(path, frames, size)
+                    report(f"{frames} frames @ {size}px", path)
+    # ru_maxrss is in KiB on Linux
+    print(f"Process max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, nargs="+", default=[30, 120])
+    parser.add_argument("--size", type=int, nargs="+", default=[512, 1024])
+    parser.add_argument("--files", nargs="*")
+    args = parser.parse_args()
+    main(args.frames, args.size, args.files)
@@ -0,0 +1,140 @@
+# backend/benchmarks/startup_time.py
+
+# Measures how fast a fresh API process becomes useful:
+# - import: time to `import main` in a new interpreter (median of --runs),
+#   plus the slowest modules main imports directly (python -X importtime).
+# - first request: time from spawning uvicorn to the first 200 from GET /.
+# - warm: time until GET /ready reports the warm-up hooks done.
+# Without FIRESTORE_EMULATOR_HOST the app gets a placeholder emulator host
+# and the Firestore listeners are disabled, so nothing touches the network.
+# With --compare it exits non-zero when a figure regresses beyond --tolerance.
+#
+# Usage (from the backend directory): python benchmarks/startup_time.py [--runs 5] [--top 10] [--output startup.json] [--compare baseline.json]
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+def app_env() -> dict:
+    env = dict(os.environ)
+    if not env.get("FIRESTORE_EMULATOR_HOST"):
+        env["FIRESTORE_EMULATOR_HOST"] = "127.0.0.1:1"
+        env["WORKLIST_VIEW_ENABLED"] = "false"
+        env["CASE_EVENTS_ENABLED"] = "false"
+    return env
+
+def import_time(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+def slowest_imports(env: dict, top: int) -> list:
+    """
+    Returns (module, cumulative ms) for the modules main imports directly.
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    direct = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)$", line)
+        # main itself is at depth 1, so its direct imports are at depth 2
+        if match and len(match.group(2)) == 3:
+            direct.append((match.group(3), int(match.group(1)) / 1000))
+    return sorted(direct, key=lambda item: item[1], reverse=True)[:top]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def first_request(env: dict, timeout: float = 60):
+    """
+    Returns (ms to the first 200 from GET /, ms until warm-up finished or None).
+    """
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            first = None
+            while time.perf_counter() - start < timeout:
+                if process.poll() is not None:
+                    sys.exit("The app exited during startup; run uvicorn main:app by hand to see why.")
+                try:
+                    if first is None:
+                        if client.get("/").status_code == 200:
+                            first = (time.perf_counter() - start) * 1000
+                        continue
+                    response = client.get("/ready")
+                    if response.status_code == 404:
+                        return first, None
+                    if response.status_code == 200:
+                        return first, (time.perf_counter() - start) * 1000
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            sys.exit(f"The app did not start within {timeout:.0f} s")
+    finally:
+        process.terminate()
+        process.wait(10)
+
+def main(runs: int, top: int, output: str, baseline: str, tolerance: float):
+    env = app_env()
+    imports = [import_time(env) for _ in range(runs)]
+    starts = [first_request(env) for _ in range(runs)]
+    warm = [w for _, w in starts if w is not None]
+    results = {
+        "import_ms": statistics.median(imports),
+        "first_request_ms": statistics.median(first for first, _ in starts),
+        "warm_ms": statistics.median(warm) if warm else None,
+    }
+
+    print(f"import main      median {results['import_ms']:7.0f} ms  (min {min(imports):.0f})")
+    print(f"first request    median {results['first_request_ms']:7.0f} ms  (from spawning uvicorn)")
+    if results["warm_ms"] is not None:
+        print(f"warm-up finished median {results['warm_ms']:7.0f} ms")
+    print("\nslowest direct imports of main:")
+    for module, ms in slowest_imports(env, top):
+        print(f"  {ms:7.1f} ms  {module}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            before = json.load(f)
+        regressions = [
+            f"{name}: {before[name]:.0f} -> {value:.0f} ms"
+            for name, value in results.items()
+            if value is not None and before.get(name) and value > before[name] * (1 + tolerance)
+        ]
+        if regressions:
+            print("\n❌ Regressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.runs, args.top, args.output, args.compare, args.tolerance)
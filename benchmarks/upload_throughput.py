@@ -0,0 +1,57 @@
+# backend/benchmarks/upload_throughput.py
+
+# Streams a synthetic DICOM-sized payload through the resumable GCS upload
+# path used by POST /cases and reports throughput and peak memory for each
+# chunk size. Runs against STORAGE_EMULATOR_HOST if set, otherwise starts
+# benchmarks/fake_gcs_server.py in-process.
+#
+# Usage (from the backend directory): python benchmarks/upload_throughput.py [--size-mb 256] [--chunk-mb 1 8 32] [--fail-rate 0.0]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Request bodies arrive from uvicorn in pieces of roughly this size
+BODY_PIECE = 64 * 1024
+
+def run(size_mb: int, chunk_mb: float, bucket: str):
+    from tools.gcs_upload import ResumableUploadSession
+
+    piece = os.urandom(BODY_PIECE)
+    pieces = size_mb * 1024 * 1024 // BODY_PIECE
+    tracemalloc.start()
+    start = time.perf_counter()
+    session = ResumableUploadSession.start(bucket, f"benchmark/{time.time_ns()}.dcm", "application/dicom",
+                                           chunk_size=int(chunk_mb * 1024 * 1024))
+    for _ in range(pieces):
+        session.append(piece)
+        if session.ready():
+            session.flush()
+    resource = session.finish()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert int(resource["size"]) == pieces * BODY_PIECE
+    return elapsed, peak
+
+def main(size_mb: int, chunk_sizes, bucket: str, fail_rate: float):
+    if not os.getenv("STORAGE_EMULATOR_HOST"):
+        from benchmarks.fake_gcs_server import start_fake_gcs
+        _, url = start_fake_gcs(fail_rate=fail_rate)
+        os.environ["STORAGE_EMULATOR_HOST"] = url
+    print(f"Uploading {size_mb} MiB to {os.environ['STORAGE_EMULATOR_HOST']}")
+    for chunk_mb in chunk_sizes:
+        elapsed, peak = run(size_mb, chunk_mb, bucket)
+        print(f"  chunk {chunk_mb:>5g} MiB  {size_mb / elapsed:8.1f} MiB/s  peak Python memory {peak / 2**20:7.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--chunk-mb", type=float, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--bucket", default="benchmark-bucket")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    main(args.size_mb, args.chunk_mb, args.bucket, args.fail_rate)
@@ -0,0 +1,124 @@
+# backend/benchmarks/worklist_consistency.py
+
+# Checks the in-memory worklist (tools/worklist.py) against the Firestore
+# emulator. It applies random creates, status changes and deletes to
+# `cases`, then compares every page the view serves with the same page from
+# data_access.list_cases. It also drops the listener on purpose to check
+# that the view falls back and then resyncs. Reports how long the view takes
+# to reflect each write.
+#
+# Start the emulator first (firebase emulators:start --only firestore) and export FIRESTORE_EMULATOR_HOST.
+# Usage (from the backend directory): python benchmarks/worklist_consistency.py [--cases 300] [--writes 500]
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ["pending_junior_review", "pending_senior_review", "confirmed_stenosis", "closed_no_stenosis"]
+
+def wait_for(predicate, timeout: float = 10.0) -> float:
+    start = time.perf_counter()
+    while not predicate():
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("Worklist view did not catch up")
+        time.sleep(0.002)
+    return time.perf_counter() - start
+
+async def all_pages(fetch_page):
+    items, token = [], None
+    while True:
+        page, token = await fetch_page(token)
+        items.extend(page)
+        if not token:
+            return items
+
+async def compare(view, data_access, page_size: int):
+    for status in view.statuses:
+        async def from_view(token):
+            return view.page(status, page_size, token)
+
+        async def from_firestore(token):
+            docs, next_token = await data_access.list_cases("status", status, page_size, token)
+            return [{"id": case_id, "createdAt": data["createdAt"].timestamp()} for case_id, data in docs], next_token
+
+        served = [(case["id"], case["createdAt"]["_seconds"]) for case in await all_pages(from_view)]
+        expected = [(case["id"], int(case["createdAt"])) for case in await all_pages(from_firestore)]
+        if served != expected:
+            raise AssertionError(f"{status}: view has {len(served)} cases, Firestore has {len(expected)}")
+
+def main(case_count: int, writes: int, page_size: int):
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST to the running Firestore emulator.")
+    import firebase_admin
+    from tools.emulators import EmulatorCredential, EMULATOR_PROJECT_ID
+
+    firebase_admin.initialize_app(EmulatorCredential(), {"projectId": EMULATOR_PROJECT_ID})
+
+    from tools import data_access
+    from tools.worklist import WorklistView
+
+    db = data_access.get_db()
+    cases = db.collection("cases")
+    for doc in cases.list_documents():
+        doc.delete()
+
+    rng = random.Random(0)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(case_count):
+        cases.document(f"case-{i:05d}").set({
+            "patientName": f"Patient {i}",
+            "patientEmail": f"patient{i % 50}@example.com",
+            "status": rng.choice(STATUSES),
+            "createdAt": base + timedelta(seconds=rng.randint(0, 86400)),
+        })
+
+    # One loop for the whole run, since the async Firestore client binds to it
+    loop = asyncio.new_event_loop()
+    view = WorklistView(health_check_interval=0.5)
+    view.start()
+    print(f"Initial sync of {case_count} cases: {wait_for(lambda: view.ready) * 1000:.1f} ms")
+    loop.run_until_complete(compare(view, data_access, page_size))
+
+    lags = []
+    for i in range(writes):
+        case_id = f"case-{rng.randrange(case_count + writes):05d}"
+        action = rng.random()
+        if action < 0.1:
+            cases.document(case_id).delete()
+            expected = None
+        else:
+            status = rng.choice(STATUSES)
+            cases.document(case_id).set({
+                "patientName": f"Patient {case_id}",
+                "patientEmail": "patient@example.com",
+                "status": status,
+                "createdAt": base + timedelta(seconds=rng.randint(0, 86400)),
+            })
+            expected = status if status in view.statuses else None
+        lags.append(wait_for(lambda: view._status_by_case.get(case_id) == expected) * 1000)
+    loop.run_until_complete(compare(view, data_access, page_size))
+    p95 = statistics.quantiles(lags, n=100, method="inclusive")[94]
+    print(f"{writes} writes: view lag mean {statistics.mean(lags):.1f} ms, p95 {p95:.1f} ms")
+
+    # Simulate a dropped stream: the view must refuse to serve, then resync
+    view.listener._watch.close()
+    wait_for(lambda: not view.ready or view.stats()["restarts"] > 0)
+    cases.document("case-after-drop").set({"status": "pending_junior_review", "createdAt": base})
+    print(f"Resync after listener drop: {wait_for(lambda: view.ready and 'case-after-drop' in view._status_by_case, 30) * 1000:.1f} ms")
+    loop.run_until_complete(compare(view, data_access, page_size))
+    view.stop()
+    print("✅ Worklist view matches Firestore")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=25)
+    args = parser.parse_args()
+    main(args.cases, args.writes, args.page_size)
@@ -1,19 +1,39 @@
 from tools.firestore_tools import get_patient_email, update_case_status_in_db
-from tools.gmail_tool import send_notification_email
-from tools.calendar_tool import create_appointment_event
+from tools.notification_dispatcher import dispatch_notification_email, dispatch_appointment_event
 from .state import WorkflowState
 
+class SideEffectError(RuntimeError):
+    """
+    A tool reported that its call failed.
+    """
+
+def _side_effect(name: str, result: str) -> dict:
+    """
+    Records one side effect's result for the state reducers. The tools
+    return an "Error ..." message instead of raising, so a failure is
+    raised here. The run then stops at this node: the checkpoint keeps
+    the nodes and parallel branches that succeeded, and the review job's
+    retry resumes only the failed one.
+    """
+    if isinstance(result, str) and result.startswith("Error"):
+        raise SideEffectError(f"{name}: {result}")
+    return {"side_effects": {name: result}}
+
 def start_review_process(state: WorkflowState) -> WorkflowState:
     """
-    Initial node: Fetches the patient's email to enrich the state.
+    Initial node: Fetches the patient's email to enrich the state, unless
+    the caller already supplied it (bulk reviews prefetch all emails at once).
     """
     print("--- Starting Review Process ---")
     case_id = state["case_id"]
-    patient_email = get_patient_email(case_id)
+    # Clear branch results left on the case thread by an earlier review
+    update = {"side_effects": None}
+    patient_email = state.get("patient_email") or get_patient_email(case_id)
     if patient_email:
-        state["patient_email"] = patient_email
-    print(f"State after start: {state}")
-    return state
+        update["patient_email"] = patient_email
+    state_after = {**state, **update}
+    print(f"State after start: {state_after}")
+    return update
 
 def decide_next_step(state: WorkflowState) -> WorkflowState:
     """
@@ -26,16 +46,16 @@ def decide_next_step(state: WorkflowState) -> WorkflowState:
 
     if decision == "rejected":
         # Any rejection, regardless of role, starts the 'close case' process.
-        state["next_step"] = "close_case_no_stenosis"
+        next_step = "close_case_no_stenosis"
     elif doctor_role == "junior_doctor" and decision == "confirmed":
-        state["next_step"] = "escalate_to_senior"
+        next_step = "escalate_to_senior"
     elif doctor_role == "senior_doctor" and decision == "confirmed":
-        state["next_step"] = "notify_and_schedule"
+        next_step = "notify_and_schedule"
     else:
-        state["next_step"] = "end" # Fallback
+        next_step = "end" # Fallback
         
-    print(f"Decision: Next step is '{state['next_step']}'")
-    return state
+    print(f"Decision: Next step is '{next_step}'")
+    return {"next_step": next_step}
 
 def escalate_to_senior(state: WorkflowState):
     """
@@ -45,8 +65,8 @@ def escalate_to_senior(state: WorkflowState):
     print("--- Escalating to Senior Doctor ---")
     case_id = state["case_id"]
     findings = state["findings"]
-    update_case_status_in_db(case_id, "pending_senior_review", findings)
-    return {"next_step": "end"} # End this workflow run
+    result = update_case_status_in_db(case_id, "pending_senior_review", findings)
+    return {"next_step": "end", **_side_effect("case_update", result)} # End this workflow run
 
 def close_case_no_stenosis(state: WorkflowState):
     """
@@ -56,9 +76,9 @@ def close_case_no_stenosis(state: WorkflowState):
     print("--- Closing Case (No Stenosis) ---")
     case_id = state["case_id"]
     findings = state["findings"]
-    update_case_status_in_db(case_id, "closed_no_stenosis", findings)
+    result = update_case_status_in_db(case_id, "closed_no_stenosis", findings)
     # The graph will now route to the email node
-    return state
+    return _side_effect("case_update", result)
 
 def send_satisfactory_email(state: WorkflowState):
     """
@@ -85,23 +105,33 @@ def send_satisfactory_email(state: WorkflowState):
     Sincerely,
     CardioSenseAI Clinic
     """
-    send_notification_email(patient_email, email_subject, email_body)
-    return {"next_step": "end"}
+    result = dispatch_notification_email(patient_email, email_subject, email_body)
+    return {"next_step": "end", **_side_effect("email", result)}
 
 def notify_and_schedule(state: WorkflowState):
     """
-    The final node for a confirmed high-risk case. Updates the DB,
-    sends email, and creates a calendar event.
+    Fan-out point for a confirmed high-risk case. The database update, the
+    email and the calendar event are independent, so the graph runs them as
+    parallel branches and joins them in finish_notification.
     """
     print("--- Notifying Patient and Scheduling Appointment ---")
+    return {}
+
+def update_confirmed_case(state: WorkflowState):
+    """
+    Branch: marks the case as closed with stenosis confirmed.
+    """
+    result = update_case_status_in_db(state["case_id"], "closed_stenosis_confirmed", state["findings"])
+    return _side_effect("case_update", result)
+
+def send_follow_up_email(state: WorkflowState):
+    """
+    Branch: tells the patient a follow-up appointment has been scheduled.
+    """
     case_id = state["case_id"]
     findings = state["findings"]
     patient_email = state["patient_email"]
 
-    # 1. Update the database
-    update_case_status_in_db(case_id, "closed_stenosis_confirmed", findings)
-
-    # 2. Send email notification
     email_subject = "Important: Your Angiography Results and Follow-up Appointment"
     email_body = f"""
     Dear Patient,
@@ -116,10 +146,19 @@ def notify_and_schedule(state: WorkflowState):
     Sincerely,
     CardioSenseAI Clinic
     """
-    send_notification_email(patient_email, email_subject, email_body)
+    result = dispatch_notification_email(patient_email, email_subject, email_body)
+    return _side_effect("email", result)
 
-    # 3. Create calendar event
-    create_appointment_event(patient_email)
-    
-    return {"next_step": "end"}
+def create_follow_up_event(state: WorkflowState):
+    """
+    Branch: creates the follow-up calendar event.
+    """
+    result = dispatch_appointment_event(state["patient_email"])
+    return _side_effect("calendar_event", result)
 
+def finish_notification(state: WorkflowState):
+    """
+    Fan-in: runs once all three branches have succeeded.
+    """
+    print("--- Patient notified and appointment scheduled ---")
+    return {"next_step": "end"}
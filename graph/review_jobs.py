@@ -0,0 +1,268 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REVIEW_QUEUE_DB = os.getenv("REVIEW_QUEUE_DB", "review_jobs.sqlite3")
+REVIEW_WORKERS = int(os.getenv("REVIEW_WORKERS", "4"))
+REVIEW_MAX_ATTEMPTS = int(os.getenv("REVIEW_MAX_ATTEMPTS", "5"))
+REVIEW_BACKOFF_SECONDS = float(os.getenv("REVIEW_BACKOFF_SECONDS", "2"))
+REVIEW_BACKOFF_MAX_SECONDS = float(os.getenv("REVIEW_BACKOFF_MAX_SECONDS", "300"))
+# A claimed job whose worker died is picked up again once its lease runs out.
+REVIEW_LEASE_SECONDS = float(os.getenv("REVIEW_LEASE_SECONDS", "600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_jobs (
+    id TEXT PRIMARY KEY,
+    case_id TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_run_at REAL NOT NULL,
+    locked_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS review_jobs_ready ON review_jobs (status, next_run_at);
+CREATE INDEX IF NOT EXISTS review_jobs_case ON review_jobs (case_id, status);
+CREATE TABLE IF NOT EXISTS case_leases (
+    case_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    locked_until REAL NOT NULL
+);
+"""
+
+class ReviewConflict(Exception):
+    """
+    The review was already submitted with different findings.
+    """
+
+class ReviewJobQueue:
+    """
+    SQLite-backed queue of review workflow runs.
+    Jobs move through queued -> running -> succeeded | failed. A job is
+    identified per case by (case_id, doctor_role, decision), so repeated
+    submissions of the same review return the existing job instead of
+    running the workflow twice. Resubmitting it with other findings is
+    rejected rather than silently dropping them.
+    """
+
+    def __init__(self, path: str = REVIEW_QUEUE_DB, max_attempts: int = REVIEW_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job.pop("locked_until", None)
+        return job
+
+    def enqueue(self, payload: dict) -> dict:
+        """
+        Adds a review run for `payload["case_id"]` and returns the job.
+        A permanently failed job with the same key is re-queued with the
+        new payload; any other job with the same key raises ReviewConflict
+        if its findings differ.
+        """
+        key = f"{payload['case_id']}:{payload['doctor_role']}:{payload['decision']}"
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM review_jobs WHERE idempotency_key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO review_jobs (id, case_id, idempotency_key, payload, status, next_run_at, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (str(uuid.uuid4()), payload["case_id"], key, json.dumps(payload), now, now, now),
+                )
+            elif row["status"] == "failed":
+                conn.execute(
+                    "UPDATE review_jobs SET status = 'queued', attempts = 0, payload = ?, last_error = NULL,"
+                    " next_run_at = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(payload), now, now, row["id"]),
+                )
+            elif json.loads(row["payload"]).get("findings") != payload.get("findings"):
+                raise ReviewConflict(
+                    f"Case {payload['case_id']} was already reviewed as '{payload['decision']}' with different findings."
+                )
+            row = conn.execute("SELECT * FROM review_jobs WHERE idempotency_key = ?", (key,)).fetchone()
+            conn.execute("COMMIT")
+            return self._to_job(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, job_id: str):
+        with closing(self._connect()) as conn:
+            return self._to_job(conn.execute("SELECT * FROM review_jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, lease_seconds: float = REVIEW_LEASE_SECONDS):
+        """
+        Atomically takes the next due job (or one whose lease expired).
+        Jobs for a case that is already running, or leased by a batch
+        review, wait so two workflow runs never share a case thread.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM review_jobs"
+                " WHERE ((status = 'queued' AND next_run_at <= ?) OR (status = 'running' AND locked_until < ?))"
+                " AND case_id NOT IN (SELECT case_id FROM review_jobs WHERE status = 'running' AND locked_until >= ?)"
+                " AND case_id NOT IN (SELECT case_id FROM case_leases WHERE locked_until >= ?)"
+                " ORDER BY next_run_at LIMIT 1",
+                (now, now, now, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE review_jobs SET status = 'running', attempts = attempts + 1, locked_until = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (now + lease_seconds, now, row["id"]),
+                )
+                row = conn.execute("SELECT * FROM review_jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+            return self._to_job(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def lease_cases(self, case_ids: list, lease_seconds: float = REVIEW_LEASE_SECONDS):
+        """
+        Reserves cases for a run outside the queue (batch reviews). Returns
+        (owner, leased case ids). Cases with a queued or running job, or an
+        active lease, are left out.
+        """
+        owner = str(uuid.uuid4())
+        now = time.time()
+        placeholders = ",".join("?" * len(case_ids))
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            busy = {row[0] for row in conn.execute(
+                f"SELECT case_id FROM review_jobs WHERE case_id IN ({placeholders})"
+                " AND (status = 'queued' OR (status = 'running' AND locked_until >= ?))",
+                (*case_ids, now),
+            )}
+            busy.update(row[0] for row in conn.execute(
+                f"SELECT case_id FROM case_leases WHERE case_id IN ({placeholders}) AND locked_until >= ?",
+                (*case_ids, now),
+            ))
+            leased = [case_id for case_id in case_ids if case_id not in busy]
+            conn.executemany(
+                "INSERT OR REPLACE INTO case_leases (case_id, owner, locked_until) VALUES (?, ?, ?)",
+                [(case_id, owner, now + lease_seconds) for case_id in leased],
+            )
+            conn.execute("COMMIT")
+            return owner, leased
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release_cases(self, owner: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM case_leases WHERE owner = ?", (owner,))
+
+    def mark_succeeded(self, job_id: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE review_jobs SET status = 'succeeded', last_error = NULL, locked_until = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def mark_failed(self, job: dict, error: str, retry: bool = True):
+        """
+        Schedules a retry with exponential backoff and jitter, or marks the
+        job failed once it has used all of its attempts (or at once when
+        `retry` is False).
+        """
+        now = time.time()
+        if not retry or job["attempts"] >= self.max_attempts:
+            status, next_run_at = "failed", now
+        else:
+            delay = min(REVIEW_BACKOFF_MAX_SECONDS, REVIEW_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1))
+            status, next_run_at = "queued", now + delay * random.uniform(0.5, 1.0)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE review_jobs SET status = ?, last_error = ?, next_run_at = ?, locked_until = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (status, error, next_run_at, now, job["id"]),
+            )
+
+class ReviewWorkerPool:
+    """
+    Background threads that drain the queue and run `handler(payload)`
+    for each job. Any exception from the handler counts as a failed attempt;
+    the workflow nodes raise when a Firestore, Gmail or Calendar call fails.
+    A ReviewConflict fails the job without retrying.
+    """
+
+    def __init__(self, queue: ReviewJobQueue, handler, workers: int = REVIEW_WORKERS, poll_interval: float = 0.5):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"review-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"❌ Review Queue Error: Failed to claim job. Error: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            print(f"--- Running review job {job['id']} for case {job['case_id']} (attempt {job['attempts']}) ---")
+            try:
+                self.handler(job["payload"])
+                self.queue.mark_succeeded(job["id"])
+            except ReviewConflict as e:
+                # Retrying cannot change the stored review
+                print(f"❌ Review Job Error: Job {job['id']} conflicts with an earlier review. Error: {e}")
+                self.queue.mark_failed(job, str(e), retry=False)
+            except Exception as e:
+                print(f"❌ Review Job Error: Job {job['id']} failed. Error: {e}")
+                self.queue.mark_failed(job, str(e))
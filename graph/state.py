@@ -1,4 +1,13 @@
-from typing import TypedDict
+from typing import Annotated, Optional, TypedDict
+
+def merge_side_effects(current: Optional[dict], update: Optional[dict]) -> dict:
+    """
+    Reducer for results written by parallel branches. Passing None clears
+    the results at the start of a new run on the same case thread.
+    """
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
 
 class WorkflowState(TypedDict):
     """
@@ -11,3 +20,5 @@ class WorkflowState(TypedDict):
     findings: str
     doctor_role: str       # 'junior_doctor' or 'senior_doctor'
     next_step: str         # The result of our routing decision
+    side_effects: Annotated[dict, merge_side_effects]   # Per-branch results, e.g. {"email": "..."}
+    request_id: str        # Id of the API request that submitted the review, for tracing
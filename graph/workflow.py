@@ -1,51 +1,245 @@
-from langgraph.graph import StateGraph, END
+import os
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from tools.firestore_tools import get_patient_emails
+from tools.metrics import instrument_node
+from .review_jobs import ReviewConflict
 from .state import WorkflowState
-from .nodes import (
-    start_review_process,
-    decide_next_step,
-    escalate_to_senior,
-    close_case_no_stenosis,
-    send_satisfactory_email, # <-- Import the new node
-    notify_and_schedule
-)
-
-# Create a new graph
-workflow = StateGraph(WorkflowState)
-
-# Define the nodes
-workflow.add_node("start_review", start_review_process)
-workflow.add_node("decide_next_step", decide_next_step)
-workflow.add_node("escalate_to_senior", escalate_to_senior)
-workflow.add_node("close_case_no_stenosis", close_case_no_stenosis)
-workflow.add_node("send_satisfactory_email", send_satisfactory_email) # <-- Add the new node
-workflow.add_node("notify_and_schedule", notify_and_schedule)
-
-# Define the connections (edges) between nodes
-workflow.set_entry_point("start_review")
-workflow.add_edge("start_review", "decide_next_step")
-
-# This edge handles the path for rejected cases
-workflow.add_edge("close_case_no_stenosis", "send_satisfactory_email")
-
-# Define the conditional logic for routing from the decision node
-workflow.add_conditional_edges(
-    "decide_next_step",
-    lambda x: x["next_step"],
-    {
-        "escalate_to_senior": "escalate_to_senior",
-        # Any rejection now goes to the 'close_case' node first
-        "close_case_no_stenosis": "close_case_no_stenosis",
-        "notify_and_schedule": "notify_and_schedule",
-        "end": END
+
+def build_workflow():
+    """
+    Defines the review graph. LangGraph and the nodes (which pull in the
+    Google API clients) are imported here rather than at module level,
+    because they dominate the API's import time; the graph is built on
+    first use or by the startup warm-up.
+    """
+    from langgraph.graph import StateGraph, END
+    from .nodes import (
+        start_review_process,
+        decide_next_step,
+        escalate_to_senior,
+        close_case_no_stenosis,
+        send_satisfactory_email, # <-- Import the new node
+        notify_and_schedule,
+        update_confirmed_case,
+        send_follow_up_email,
+        create_follow_up_event,
+        finish_notification,
+    )
+
+    # Create a new graph
+    workflow = StateGraph(WorkflowState)
+
+    # Define the nodes
+    workflow.add_node("start_review", instrument_node("start_review", start_review_process))
+    workflow.add_node("decide_next_step", instrument_node("decide_next_step", decide_next_step))
+    workflow.add_node("escalate_to_senior", instrument_node("escalate_to_senior", escalate_to_senior))
+    workflow.add_node("close_case_no_stenosis", instrument_node("close_case_no_stenosis", close_case_no_stenosis))
+    workflow.add_node("send_satisfactory_email", instrument_node("send_satisfactory_email", send_satisfactory_email)) # <-- Add the new node
+    workflow.add_node("notify_and_schedule", instrument_node("notify_and_schedule", notify_and_schedule))
+    workflow.add_node("update_confirmed_case", instrument_node("update_confirmed_case", update_confirmed_case))
+    workflow.add_node("send_follow_up_email", instrument_node("send_follow_up_email", send_follow_up_email))
+    workflow.add_node("create_follow_up_event", instrument_node("create_follow_up_event", create_follow_up_event))
+    workflow.add_node("finish_notification", instrument_node("finish_notification", finish_notification))
+
+    # Define the connections (edges) between nodes
+    workflow.set_entry_point("start_review")
+    workflow.add_edge("start_review", "decide_next_step")
+
+    # This edge handles the path for rejected cases
+    workflow.add_edge("close_case_no_stenosis", "send_satisfactory_email")
+
+    # Define the conditional logic for routing from the decision node
+    workflow.add_conditional_edges(
+        "decide_next_step",
+        lambda x: x["next_step"],
+        {
+            "escalate_to_senior": "escalate_to_senior",
+            # Any rejection now goes to the 'close_case' node first
+            "close_case_no_stenosis": "close_case_no_stenosis",
+            "notify_and_schedule": "notify_and_schedule",
+            "end": END
+        }
+    )
+
+    # Confirmed cases fan out to three independent side effects that run in
+    # parallel, then join once all of them have finished
+    notification_branches = ["update_confirmed_case", "send_follow_up_email", "create_follow_up_event"]
+    for branch in notification_branches:
+        workflow.add_edge("notify_and_schedule", branch)
+    workflow.add_edge(notification_branches, "finish_notification")
+
+    # Add edges from the terminal nodes to the end
+    workflow.add_edge("escalate_to_senior", END)
+    workflow.add_edge("finish_notification", END)
+    workflow.add_edge("send_satisfactory_email", END) # The new terminal node for satisfactory results
+    return workflow
+
+
+# Checkpoints are stored per case (thread_id = case_id) so an interrupted
+# run resumes after its last completed node instead of starting over.
+load_dotenv()
+WORKFLOW_CHECKPOINT_DB = os.getenv("WORKFLOW_CHECKPOINT_DB", "workflow_checkpoints.sqlite3")
+# Workflow runs executed at once by run_reviews
+REVIEW_BATCH_CONCURRENCY = int(os.getenv("REVIEW_BATCH_CONCURRENCY", "8"))
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """
+    Returns the compiled workflow, compiling it and opening the checkpoint
+    database on the first call.
+    """
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+                checkpointer = SqliteSaver(sqlite3.connect(WORKFLOW_CHECKPOINT_DB, check_same_thread=False))
+                # Compile the graph into a runnable application
+                _app = build_workflow().compile(checkpointer=checkpointer)
+    return _app
+
+def _thread_config(case_id: str) -> dict:
+    return {"configurable": {"thread_id": case_id}}
+
+def _compare_review(previous: dict, initial_state: WorkflowState):
+    """
+    Compares the review stored on a case thread with a new one: "same"
+    when the doctor role, decision and findings all match, "conflict" when
+    only the findings differ, and None for a different review.
+    """
+    if (previous.get("doctor_role"), previous.get("decision")) != (initial_state["doctor_role"], initial_state["decision"]):
+        return None
+    return "same" if previous.get("findings") == initial_state["findings"] else "conflict"
+
+def _conflict_message(initial_state: WorkflowState) -> str:
+    return f"Case {initial_state['case_id']} was already reviewed as '{initial_state['decision']}' with different findings."
+
+def run_review(initial_state: WorkflowState):
+    """
+    Runs the review workflow for a case, using the case id as the thread id.
+    - If an earlier run for the case was interrupted, it is resumed first.
+    - If the same review (doctor role, decision and findings) already ran
+      to the end, the stored result is returned without re-running any
+      side effects. A failed side effect raises and leaves the run
+      interrupted, so a finished run had none.
+    - If it ran with other findings, ReviewConflict is raised rather than
+      dropping the new findings or repeating the side effects.
+    """
+    app = get_app()
+    config = _thread_config(initial_state["case_id"])
+    snapshot = app.get_state(config)
+    previous = snapshot.values or {}
+    match = _compare_review(previous, initial_state)
+
+    if snapshot.next:
+        print(f"--- Resuming interrupted review for case {initial_state['case_id']} at {snapshot.next} ---")
+        result = app.invoke(None, config)
+        if match == "same":
+            return result
+    elif match == "same":
+        print(f"--- Review for case {initial_state['case_id']} already completed; skipping ---")
+        return previous
+    if match == "conflict":
+        raise ReviewConflict(_conflict_message(initial_state))
+
+    return app.invoke(initial_state, config)
+
+def review_outcome(case_id: str, status: str, result=None, error: str = None) -> dict:
+    """
+    One entry of a batch review's results.
+    """
+    result = result if isinstance(result, dict) else {}
+    return {
+        "caseId": case_id,
+        "status": status,
+        "nextStep": result.get("next_step"),
+        "sideEffects": sorted(result.get("side_effects") or {}),
+        "error": error,
     }
-)
 
-# Add edges from the terminal nodes to the end
-workflow.add_edge("escalate_to_senior", END)
-workflow.add_edge("notify_and_schedule", END)
-workflow.add_edge("send_satisfactory_email", END) # The new terminal node for satisfactory results
+def _failed_outcome(app, case_id: str, error: Exception) -> dict:
+    """
+    Outcome of a run that raised. A run stopped by a failed side effect
+    after others were already written to its checkpoint is "partial":
+    those side effects happened, and resuming the case only retries the
+    failed one. Any other failure is "failed".
+    """
+    from .nodes import SideEffectError
+    if isinstance(error, SideEffectError):
+        values = app.get_state(_thread_config(case_id)).values or {}
+        if values.get("side_effects"):
+            return review_outcome(case_id, "partial", values, error=str(error))
+    return review_outcome(case_id, "failed", error=str(error))
 
+def run_reviews(initial_states: list, max_concurrency: int = REVIEW_BATCH_CONCURRENCY) -> list:
+    """
+    Bulk form of run_review. Case ids must be unique. Returns one outcome
+    per state, in order.
+    - All patient emails are read up front with one Firestore get_all, and
+      cases that do not exist are reported as "not_found" without running.
+    - Interrupted runs are resumed and new runs started with app.batch,
+      at most `max_concurrency` at a time. A failing case is reported as
+      "partial" or "failed" without affecting the others.
+    - A case already reviewed with the same role and decision is "skipped"
+      when the findings match, and a "conflict" when they differ.
+    """
+    outcomes = [None] * len(initial_states)
+    missing = [state["case_id"] for state in initial_states if not state.get("patient_email")]
+    emails = get_patient_emails(missing)
+    states = []
+    for i, state in enumerate(initial_states):
+        # If the prefetch itself failed, each run falls back to reading its own email
+        if emails is not None and state["case_id"] in missing:
+            if state["case_id"] not in emails:
+                outcomes[i] = review_outcome(state["case_id"], "not_found", error="Case not found.")
+                continue
+            state = {**state, "patient_email": emails[state["case_id"]]}
+        states.append((i, state))
+    batch_config = {"max_concurrency": max_concurrency}
+    app = get_app()
 
-# Compile the graph into a runnable application
-app = workflow.compile()
+    # Finish interrupted runs first so a new review never overlaps an old one
+    snapshots = {i: app.get_state(_thread_config(state["case_id"])) for i, state in states}
+    matches = {i: _compare_review(snapshots[i].values or {}, state) for i, state in states}
+    interrupted = [(i, state) for i, state in states if snapshots[i].next]
+    if interrupted:
+        print(f"--- Resuming {len(interrupted)} interrupted review(s) ---")
+        results = app.batch(
+            [None] * len(interrupted),
+            [{**batch_config, **_thread_config(state["case_id"])} for _, state in interrupted],
+            return_exceptions=True,
+        )
+        for (i, state), result in zip(interrupted, results):
+            if isinstance(result, Exception):
+                outcomes[i] = _failed_outcome(app, state["case_id"], result)
+            elif matches[i] == "same":
+                outcomes[i] = review_outcome(state["case_id"], "completed", result)
+            elif matches[i] == "conflict":
+                outcomes[i] = review_outcome(state["case_id"], "conflict", result, error=_conflict_message(state))
 
+    fresh = []
+    for i, state in states:
+        if outcomes[i] is not None:
+            continue
+        if matches[i] == "same":
+            outcomes[i] = review_outcome(state["case_id"], "skipped", snapshots[i].values)
+        elif matches[i] == "conflict":
+            outcomes[i] = review_outcome(state["case_id"], "conflict", snapshots[i].values, error=_conflict_message(state))
+        else:
+            fresh.append((i, state))
+    if fresh:
+        results = app.batch(
+            [state for _, state in fresh],
+            [{**batch_config, **_thread_config(state["case_id"])} for _, state in fresh],
+            return_exceptions=True,
+        )
+        for (i, state), result in zip(fresh, results):
+            if isinstance(result, Exception):
+                outcomes[i] = _failed_outcome(app, state["case_id"], result)
+            else:
+                outcomes[i] = review_outcome(state["case_id"], "completed", result)
+    return outcomes
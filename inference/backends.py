@@ -0,0 +1,106 @@
+import os
+import random
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Stenosis probability at or above which a case goes to the senior queue
+HIGH_RISK_THRESHOLD = float(os.getenv("INFERENCE_HIGH_RISK_THRESHOLD", "0.8"))
+
+def build_model_result(risk_level: str, confidence: int) -> dict:
+    """
+    Builds the riskLevel/modelReport result that decides whether a case is
+    routed to pending_senior_review or pending_junior_review.
+    """
+    if risk_level == "high":
+        report_text = f"Model analysis indicates a high probability ({confidence}%) of significant stenosis. Immediate review by a senior specialist is recommended."
+    else:
+        report_text = f"Model analysis indicates a low to moderate probability ({confidence}%) of stenosis. A routine check by a junior doctor is advised."
+    return {"riskLevel": risk_level, "modelReport": report_text}
+
+class ModelBackend:
+    """
+    Interface for inference backends. Instances are created inside the
+    inference worker processes, so constructors may load model weights.
+    Each input is a dict with at least `filename`; backends that set
+    `needs_pixels` receive a float32 `pixels` array from the preprocessing stage.
+    """
+
+    needs_pixels = False
+
+    def predict_batch(self, inputs: list) -> list:
+        raise NotImplementedError
+
+class SimulatorBackend(ModelBackend):
+    """
+    The original random stub: roughly one in three cases is high risk.
+    """
+
+    def predict_batch(self, inputs: list) -> list:
+        results = []
+        for item in inputs:
+            print(f"--- Simulating AI analysis for file: {item['filename']} ---")
+            risk_level = random.choice(['high', 'low', 'low'])
+            confidence = random.randint(80, 95) if risk_level == 'high' else random.randint(60, 79)
+            print(f"--- Simulation Result: Risk Level='{risk_level}' ---")
+            results.append(build_model_result(risk_level, confidence))
+        return results
+
+class OnnxBackend(ModelBackend):
+    """
+    Runs a stenosis classifier on CPU. Uses onnxruntime for `.onnx` models
+    and a NumPy reference implementation for `.npz` logistic-regression
+    weights (`weights` of length H*W and a scalar `bias`), which is handy
+    for exercising the pipeline without onnxruntime installed.
+    Both expect a batch of (frames, H, W) float32 pixel arrays and output the
+    probability of significant stenosis per study.
+    """
+
+    needs_pixels = True
+
+    def __init__(self, model_path: str):
+        import numpy as np
+
+        self.np = np
+        if model_path.endswith(".onnx"):
+            try:
+                import onnxruntime
+            except ImportError as e:
+                raise RuntimeError("onnxruntime is required for .onnx models: pip install onnxruntime") from e
+            self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            self.weights = None
+        else:
+            params = np.load(model_path)
+            self.session = None
+            self.weights = params["weights"].astype(np.float32)
+            self.bias = float(params["bias"])
+
+    def _probabilities(self, batch):
+        np = self.np
+        if self.session is not None:
+            (output,) = self.session.run(None, {self.input_name: batch})
+            return np.asarray(output, dtype=np.float32).reshape(len(batch))
+        # Reference model: average over frames, then a logistic regression on the pixels
+        features = batch.mean(axis=1).reshape(len(batch), -1)
+        return 1.0 / (1.0 + np.exp(-(features @ self.weights + self.bias)))
+
+    def predict_batch(self, inputs: list) -> list:
+        missing = [item["filename"] for item in inputs if item.get("pixels") is None]
+        if missing:
+            raise ValueError(f"No preprocessed pixels for: {', '.join(missing)}")
+        batch = self.np.stack([item["pixels"] for item in inputs]).astype(self.np.float32, copy=False)
+        results = []
+        for probability in self._probabilities(batch):
+            risk_level = "high" if probability >= HIGH_RISK_THRESHOLD else "low"
+            results.append(build_model_result(risk_level, int(round(float(probability) * 100))))
+        return results
+
+def create_backend(name: str, model_path: str = None) -> ModelBackend:
+    if name == "simulator":
+        return SimulatorBackend()
+    if name == "onnx":
+        if not model_path:
+            raise ValueError("INFERENCE_MODEL_PATH must be set for the onnx backend.")
+        return OnnxBackend(model_path)
+    raise ValueError(f"Unknown inference backend: {name}")
@@ -0,0 +1,222 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from .backends import create_backend
+
+load_dotenv()
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "simulator")
+INFERENCE_MODEL_PATH = os.getenv("INFERENCE_MODEL_PATH")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "20"))
+
+# --- Worker process side ---
+_backend = None
+_storage_client = None
+
+class ItemFailed(RuntimeError):
+    """
+    One study of a batch could not be preprocessed. Returned in place of
+    its result so the rest of the batch still runs.
+    """
+
+def _init_worker(backend_name: str, model_path: str):
+    global _backend, _storage_client
+    _backend = create_backend(backend_name, model_path)
+    if _backend.needs_pixels:
+        # Imported here so the simulator-only workers never load the storage client
+        from google.cloud import storage
+        from tools.firebase_app import init_firebase
+
+        # Same credentials as the API process, including the emulator fallback
+        app = init_firebase()
+        _storage_client = storage.Client(project=app.project_id, credentials=app.credential.get_credential())
+
+def _download_study(bucket_name: str, object_path: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".dcm")
+    os.close(fd)
+    try:
+        _storage_client.bucket(bucket_name).blob(object_path).download_to_filename(path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def _attach_pixels(item: dict):
+    """
+    Preprocesses a study in the worker process. Uses `path` if the file is
+    local, otherwise downloads `objectPath` from `bucket` to a temp file.
+    """
+    from .preprocessing import preprocess_dicom
+
+    path = item.get("path")
+    downloaded = path is None
+    if downloaded:
+        path = _download_study(item["bucket"], item["objectPath"])
+    try:
+        item["pixels"], report = preprocess_dicom(path)
+    finally:
+        if downloaded:
+            os.remove(path)
+    print(f"--- Preprocessed {item['filename']} in {report['total_ms']:.1f} ms: {report} ---")
+
+def _run_batch(inputs: list) -> list:
+    """
+    Returns one result per input. A study that fails to download or
+    preprocess gets an ItemFailed instead and is left out of the model
+    batch.
+    """
+    results = [None] * len(inputs)
+    ready = []
+    for i, item in enumerate(inputs):
+        if _backend.needs_pixels and item.get("pixels") is None:
+            try:
+                _attach_pixels(item)
+            except Exception as e:
+                # Carried as a message, since the original may not pickle back to the API process
+                results[i] = ItemFailed(f"Preprocessing {item.get('filename')} failed: {type(e).__name__}: {e}")
+                continue
+        ready.append(i)
+    if ready:
+        for i, result in zip(ready, _backend.predict_batch([inputs[i] for i in ready])):
+            results[i] = result
+    return results
+
+# --- API process side ---
+def _fail(batch, error: Exception):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches of up to `max_batch_size`,
+    waiting at most `max_wait` seconds after the first item arrives, and
+    hands each batch to the async `run_batch` callable, which must return
+    one result per item. An exception returned as an item's result fails
+    only that submission. `stop()` fails every submission still waiting.
+    """
+
+    def __init__(self, run_batch, max_batch_size: int, max_wait: float):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._task = None
+        # The event loop only keeps weak references to tasks
+        self._dispatches = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        stopped = RuntimeError("The micro-batcher was stopped.")
+        while not self._queue.empty():
+            _fail([self._queue.get_nowait()], stopped)
+        for task in self._dispatches:
+            task.cancel()
+        await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+    async def submit(self, item):
+        if self._task is None:
+            raise RuntimeError("The micro-batcher is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # Run the batch without blocking collection of the next one
+                task = asyncio.create_task(self._dispatch(batch))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+                batch = []
+        except asyncio.CancelledError:
+            _fail(batch, RuntimeError("The micro-batcher was stopped."))
+            raise
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"run_batch returned {len(results)} result(s) for {len(batch)} item(s).")
+        except asyncio.CancelledError:
+            _fail(batch, RuntimeError("The micro-batcher was stopped."))
+            raise
+        except Exception as e:
+            _fail(batch, e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+class InferenceEngine:
+    """
+    Runs the configured model backend in a pool of worker processes, so
+    CPU-bound inference never blocks the event loop, with a micro-batcher
+    in front of it.
+    """
+
+    def __init__(self, backend: str = INFERENCE_BACKEND, model_path: str = INFERENCE_MODEL_PATH,
+                 workers: int = INFERENCE_WORKERS, max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+                 max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        self.backend = backend
+        self.model_path = model_path
+        self.workers = workers
+        self.batcher = MicroBatcher(self._run_in_pool, max_batch_size, max_wait_ms / 1000)
+        self._pool = None
+
+    def start(self):
+        # Spawned workers do not inherit the API process's threads and clients
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.backend, self.model_path),
+        )
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run_in_pool(self, inputs: list) -> list:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _run_batch, inputs)
+
+    async def predict(self, item: dict) -> dict:
+        """
+        Returns {"riskLevel", "modelReport"} for one study.
+        """
+        return await self.batcher.submit(item)
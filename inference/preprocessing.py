@@ -0,0 +1,135 @@
+import os
+import time
+import tracemalloc
+import numpy as np
+import pydicom
+from pydicom.multival import MultiValue
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shape every study is resampled to before inference: (frames, height, width)
+TARGET_FRAMES = int(os.getenv("PREPROCESS_TARGET_FRAMES", "16"))
+TARGET_SIZE = int(os.getenv("PREPROCESS_TARGET_SIZE", "256"))
+
+def _open_pixels(path: str):
+    """
+    Returns the dataset header and a (frames, rows, cols) view of the pixel
+    data. Uncompressed pixel data is memory-mapped straight from the file,
+    so only the frames that are later indexed are ever read from disk;
+    compressed transfer syntaxes fall back to pydicom's decoder.
+    """
+    ds = pydicom.dcmread(path, defer_size="1 KB")
+    frames = int(getattr(ds, "NumberOfFrames", 1) or 1)
+    shape = (frames, int(ds.Rows), int(ds.Columns))
+    transfer_syntax = ds.file_meta.TransferSyntaxUID
+    # keep_deferred returns the raw element (with its file offset) without reading the pixels
+    element = ds.get_item("PixelData", keep_deferred=True)
+    if (
+        not transfer_syntax.is_compressed
+        and int(getattr(ds, "SamplesPerPixel", 1)) == 1
+        and int(ds.BitsAllocated) in (8, 16)
+        and getattr(element, "value_tell", None) is not None
+    ):
+        kind = "i" if int(getattr(ds, "PixelRepresentation", 0)) else "u"
+        byte_order = "<" if transfer_syntax.is_little_endian else ">"
+        dtype = np.dtype(f"{byte_order}{kind}{int(ds.BitsAllocated) // 8}")
+        return ds, np.memmap(path, dtype=dtype, mode="r", offset=element.value_tell, shape=shape)
+    return ds, ds.pixel_array.reshape(shape)
+
+def _first(value, default):
+    # Window centre/width may be multi-valued; the first pair is the default view
+    if value is None:
+        return default
+    return float(value[0]) if isinstance(value, MultiValue) else float(value)
+
+def select_frames(pixels, target_frames: int):
+    """
+    Picks `target_frames` evenly spaced frames (repeating frames for short
+    cines). Indexing the memmap reads only these frames from disk.
+    """
+    indices = np.linspace(0, pixels.shape[0] - 1, target_frames).round().astype(np.intp)
+    return np.asarray(pixels[indices])
+
+def apply_window(frames, ds):
+    """
+    Applies the modality rescale and the VOI window to every frame at once,
+    mapping the window to [0, 1].
+    """
+    slope = float(getattr(ds, "RescaleSlope", 1) or 1)
+    intercept = float(getattr(ds, "RescaleIntercept", 0) or 0)
+    values = frames.astype(np.float32)
+    values *= slope
+    values += intercept
+    center = _first(getattr(ds, "WindowCenter", None), None)
+    width = _first(getattr(ds, "WindowWidth", None), None)
+    if center is None or not width:
+        # No stored window: use the 1st-99th percentile range of the study
+        low, high = np.percentile(values, [1, 99])
+        center, width = (low + high) / 2, max(high - low, 1.0)
+    low = center - width / 2
+    np.clip(values, low, low + width, out=values)
+    values -= low
+    values /= width
+    return values
+
+def resample(frames, size: int):
+    """
+    Bilinear resize of every frame to (size, size), vectorised across frames.
+    """
+    _, rows, cols = frames.shape
+    y = np.linspace(0, rows - 1, size, dtype=np.float32)
+    x = np.linspace(0, cols - 1, size, dtype=np.float32)
+    y0 = np.floor(y).astype(np.intp)
+    x0 = np.floor(x).astype(np.intp)
+    y1 = np.minimum(y0 + 1, rows - 1)
+    x1 = np.minimum(x0 + 1, cols - 1)
+    wy = (y - y0)[None, :, None]
+    wx = (x - x0)[None, None, :]
+    top = frames[:, y0][:, :, x0] * (1 - wx) + frames[:, y0][:, :, x1] * wx
+    bottom = frames[:, y1][:, :, x0] * (1 - wx) + frames[:, y1][:, :, x1] * wx
+    return (top * (1 - wy) + bottom * wy).astype(np.float32, copy=False)
+
+def normalize(frames):
+    """
+    Zero-mean, unit-variance normalisation over the whole study.
+    """
+    mean = frames.mean()
+    std = frames.std()
+    frames -= mean
+    frames /= std if std > 1e-6 else 1.0
+    return frames
+
+def preprocess_dicom(path: str, target_frames: int = TARGET_FRAMES, target_size: int = TARGET_SIZE, trace_memory: bool = False):
+    """
+    Turns a (multi-frame) DICOM file into a float32 array of shape
+    (target_frames, target_size, target_size) for the model backends.
+    Returns (pixels, report) where report has per-stage timings in ms and,
+    if `trace_memory` is set, the peak traced allocation in bytes.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    timings = {}
+
+    start = time.perf_counter()
+    ds, pixels = _open_pixels(path)
+    timings["open_ms"] = (time.perf_counter() - start) * 1000
+
+    stages = [
+        ("select_frames_ms", lambda data: select_frames(data, target_frames)),
+        ("window_ms", lambda data: apply_window(data, ds)),
+        ("resample_ms", lambda data: resample(data, target_size)),
+        ("normalize_ms", normalize),
+    ]
+    data = pixels
+    for name, stage in stages:
+        start = time.perf_counter()
+        data = stage(data)
+        timings[name] = (time.perf_counter() - start) * 1000
+
+    report = {"source_shape": list(pixels.shape), "memory_mapped": isinstance(pixels, np.memmap), **timings}
+    report["total_ms"] = sum(timings.values())
+    if trace_memory:
+        report["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return data, report
@@ -1,29 +1,117 @@
+import asyncio
+import math
 import os
 import uuid
-import random
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr, ConfigDict
-import firebase_admin
-from firebase_admin import credentials, firestore, storage, auth
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, ConfigDict, TypeAdapter, ValidationError
+from firebase_admin import firestore, auth
+from google.api_core.exceptions import AlreadyExists
 from typing import List, Optional
 import logging
+import time
+from contextlib import asynccontextmanager
 
 # --- LangGraph Integration ---
-from graph.workflow import app as stenosis_workflow_app
+from graph.workflow import get_app as get_workflow_app, run_review, run_reviews, review_outcome
+from graph.review_jobs import ReviewConflict, ReviewJobQueue, ReviewWorkerPool
+from inference.engine import InferenceEngine
 from tools.gcp_auth import get_gcp_credentials
+from tools.gcs_upload import UploadTooLarge
+from tools.firebase_app import init_firebase
+from tools.google_clients import preload_discovery_docs
+from tools.auth_cache import auth_cache, STREAM_TICKET_TTL_SECONDS
+from tools.rate_limit import (
+    RATE_LIMIT_ENABLED, case_upload_limiter, review_limiter, bulk_case_limiter, bulk_review_limiter, clinic_key,
+)
+from tools import data_access
+from tools.streaming_form import StreamingFormParser, MultiFileFormParser, FormError
+from tools.worklist import WorklistView, WORKLIST_VIEW_ENABLED
+from tools.patient_index import PatientIndex, PATIENT_INDEX_ENABLED
+from tools.case_events import CaseEventHub, matches_user, CASE_EVENTS_KEEPALIVE_SECONDS
+from tools.serialization import cases_to_api, encode_json, json_response
+from tools.metrics import external_call, new_request_id, observe_http_request, render_prometheus, request_id_var
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- Firebase Initialization ---
-cred = credentials.Certificate("serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# --- Review Job Queue ---
+review_queue = ReviewJobQueue()
+review_workers = ReviewWorkerPool(review_queue, run_review)
+
+# --- Inference ---
+inference_engine = InferenceEngine()
+
+# --- Worklist ---
+worklist = WorklistView()
+
+# --- Patient Index ---
+patient_index = PatientIndex()
+
+# --- Case Events ---
+case_events = CaseEventHub()
+CASE_EVENTS_ENABLED = os.getenv("CASE_EVENTS_ENABLED", "true").lower() == "true"
+
+# --- Startup Warm-up ---
+# "background" warms up after the server starts accepting requests,
+# "blocking" before it does, "off" leaves everything to first use
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+WARMUP_HOOKS = [
+    ("workflow", get_workflow_app),
+    ("google_discovery", preload_discovery_docs),
+    ("firestore", lambda: (data_access.get_db(), data_access.get_async_db())),
+]
+warmup_timings = {}
+
+def warm_up():
+    """
+    Builds the lazily created clients ahead of the first request that needs
+    them. A failing hook is logged and left to initialize on first use.
+    """
+    for name, hook in WARMUP_HOOKS:
+        start = time.perf_counter()
+        try:
+            hook()
+            warmup_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+            print(f"✅ Warm-up: {name} ready in {warmup_timings[name]} ms")
+        except Exception as e:
+            warmup_timings[name] = f"error: {e}"
+            print(f"❌ Warm-up Error: {name} failed. Error: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Firebase is initialized here rather than at import so importing main stays cheap
+    init_firebase()
+    warmup = None
+    if STARTUP_WARMUP == "blocking":
+        await data_access.run_blocking(warm_up)
+    elif STARTUP_WARMUP == "background":
+        warmup = asyncio.create_task(data_access.run_blocking(warm_up))
+    inference_engine.start()
+    review_workers.start()
+    if WORKLIST_VIEW_ENABLED:
+        worklist.start()
+    if PATIENT_INDEX_ENABLED:
+        patient_index.start()
+    if CASE_EVENTS_ENABLED:
+        case_events.start(asyncio.get_running_loop())
+    yield
+    if CASE_EVENTS_ENABLED:
+        case_events.stop()
+    if PATIENT_INDEX_ENABLED:
+        patient_index.stop()
+    if WORKLIST_VIEW_ENABLED:
+        worklist.stop()
+    review_workers.stop()
+    await inference_engine.stop()
+    if warmup is not None:
+        await warmup
 
 # --- FastAPI App Initialization ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS CONFIGURATION ---
 origins = ["*"]
@@ -33,24 +121,106 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Page-Token", "X-Request-ID", "Retry-After"],
 )
 
+# --- Request Tracing ---
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        # Label by route template so /cases/{case_id} is one series, not one per case
+        route = request.scope.get("route")
+        observe_http_request(request.method, route.path if route else "unmatched", status, time.perf_counter() - start)
+        request_id_var.reset(token)
+
 # --- Security ---
+async def _auth_cache_call(method, *args):
+    # The shared store is SQLite, so keep its reads and writes off the event loop
+    if auth_cache.shared is None:
+        return method(*args)
+    return await data_access.run_blocking(method, *args)
+
 async def get_current_user(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authentication scheme.")
     token = authorization.split("Bearer ")[1]
     try:
-        decoded_token = auth.verify_id_token(token)
-        user_doc = db.collection('users').document(decoded_token['uid']).get()
-        if user_doc.exists:
-            return {**decoded_token, **user_doc.to_dict()}
-        raise HTTPException(status_code=404, detail="User not found in Firestore.")
+        decoded_token = await _auth_cache_call(auth_cache.get_token, token)
+        if decoded_token is None:
+            with external_call("firebase_auth", "verify_id_token"):
+                decoded_token = await data_access.run_blocking(auth.verify_id_token, token)
+            await _auth_cache_call(auth_cache.put_token, token, decoded_token)
+        profile = await _auth_cache_call(auth_cache.get_user, decoded_token['uid'])
+        if profile is None:
+            profile = await data_access.get_user_profile(decoded_token['uid'])
+            if profile is None:
+                raise HTTPException(status_code=404, detail="User not found in Firestore.")
+            await _auth_cache_call(auth_cache.put_user, decoded_token['uid'], profile)
+        return {**decoded_token, **profile}
     except auth.InvalidIdTokenError:
         raise HTTPException(status_code=401, detail="Invalid Firebase ID token.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
+async def get_stream_user(authorization: Optional[str] = Header(None), ticket: Optional[str] = None):
+    # Browsers' EventSource cannot set headers, so it passes a single-use ticket
+    # as a query parameter; the ID token itself never appears in a URL or log
+    if authorization is not None:
+        return await get_current_user(authorization)
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Missing authentication token.")
+    user = await _auth_cache_call(auth_cache.redeem_ticket, ticket)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket.")
+    return user
+
+async def take_rate_limit(limiter, current_user: dict, cost: int = 1):
+    """
+    Takes `cost` tokens from the caller's clinic bucket, answering 429 with
+    Retry-After when there are not enough, or 413 when the request costs
+    more than a full bucket and could never be let through.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    if cost > limiter.burst:
+        raise HTTPException(
+            status_code=413,
+            detail=f"This request holds {cost} items, but a clinic may send at most {limiter.burst:g} at once; split it into smaller requests.",
+        )
+    retry_after = await data_access.run_blocking(limiter.acquire, clinic_key(current_user), cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests for this clinic; please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+def rate_limited(limiter):
+    """
+    Dependency that authenticates the user and takes a token from the
+    caller's clinic bucket. Bulk endpoints call take_rate_limit themselves
+    once they know how many items a request holds.
+    """
+    async def check(current_user: dict = Depends(get_current_user)):
+        await take_rate_limit(limiter, current_user)
+        return current_user
+    return check
+
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    # The `admin` custom claim is set with auth.set_custom_user_claims; /register cannot grant it
+    if current_user.get('admin') is not True:
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return current_user
+
 # --- Pydantic Models ---
 class UserRegister(BaseModel):
     uid: str
@@ -68,117 +238,625 @@ class CaseReview(BaseModel):
     decision: str
     findings: str
 
+class BatchReviewItem(CaseReview):
+    caseId: str
+
+class BatchReviewRequest(BaseModel):
+    reviews: List[BatchReviewItem]
+
+class UploadUrlRequest(BaseModel):
+    filename: str
+    contentType: str = "application/dicom"
+
+class FinalizeCaseRequest(BaseModel):
+    objectPath: str
+    patientName: str
+    patientEmail: str
+    size: int
+    crc32c: str    # base64-encoded big-endian CRC32C, as reported by GCS
+
+class BulkCaseItem(BaseModel):
+    patientName: str
+    patientEmail: str
+
+class BulkFinalizeRequest(BaseModel):
+    items: List[FinalizeCaseRequest]
+
+# --- Pagination ---
+# Fields a client may request through `?fields=` on the case listings
+CASE_FIELDS = {"patientName", "patientEmail", "dicomFileUrl", "status", "modelReport", "findings", "createdAt"}
+
+class PageParams:
+    def __init__(
+        self,
+        page_size: int = Query(data_access.DEFAULT_PAGE_SIZE, ge=1, le=data_access.MAX_PAGE_SIZE),
+        page_token: Optional[str] = None,
+    ):
+        self.page_size = page_size
+        self.page_token = page_token
+
+def parse_case_fields(fields: Optional[str] = None) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(requested) - CASE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+def set_next_page_token(response: Response, next_page_token: Optional[str]):
+    if next_page_token:
+        response.headers["X-Next-Page-Token"] = next_page_token
+
+def case_list_response(request: Request, case_list: list, next_page_token: Optional[str]) -> Response:
+    # Serialized with orjson and compressed per Accept-Encoding; large worklists dominate response time
+    headers = {"X-Next-Page-Token": next_page_token} if next_page_token else None
+    return json_response(case_list, request.headers.get("accept-encoding", ""), headers)
+
 # --- API Endpoints ---
 @app.get("/")
 def read_root():
     return {"message": "Stenosis App Backend is running!"}
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus metrics of this process only; with several workers each one
+    keeps its own counters.
+    """
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/auth-cache/stats")
+def get_auth_cache_stats(current_user: dict = Depends(require_admin)):
+    return auth_cache.stats()
+
+@app.get("/worklist/stats")
+def get_worklist_stats(current_user: dict = Depends(require_admin)):
+    return worklist.stats()
+
+@app.get("/patient-index/stats")
+def get_patient_index_stats(current_user: dict = Depends(require_admin)):
+    return patient_index.stats()
+
+@app.get("/case-events/stats")
+def get_case_events_stats(current_user: dict = Depends(require_admin)):
+    return case_events.stats()
+
+@app.get("/rate-limits/stats")
+def get_rate_limit_stats(current_user: dict = Depends(require_admin)):
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "cases": case_upload_limiter.stats(),
+        "reviews": review_limiter.stats(),
+        "bulkCases": bulk_case_limiter.stats(),
+        "bulkReviews": bulk_review_limiter.stats(),
+    }
+
+def warmup_ready() -> bool:
+    return STARTUP_WARMUP == "off" or len(warmup_timings) == len(WARMUP_HOOKS)
+
+@app.get("/ready")
+def get_ready(response: Response):
+    """
+    Readiness probe: 200 once the startup warm-up has finished, 503 before.
+    """
+    ready = warmup_ready()
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready}
+
+@app.get("/startup/stats")
+def get_startup_stats(current_user: dict = Depends(require_admin)):
+    return {"warmup": STARTUP_WARMUP, "ready": warmup_ready(), "hooks": warmup_timings}
+
 @app.post("/register")
 async def register_user(user: UserRegister):
     try:
-        user_ref = db.collection('users').document(user.uid)
-        user_ref.set({'name': user.name, 'email': user.email, 'role': user.role})
+        profile = {'name': user.name, 'email': user.email, 'role': user.role}
+        await data_access.set_user_profile(user.uid, profile)
+        await _auth_cache_call(auth_cache.invalidate_user, user.uid)
+        # The listener would deliver this too; applying it now makes the patient searchable at once
+        patient_index.apply(user.uid, profile)
         return {"message": "User registered successfully in Firestore."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/patients")
-async def get_patients(current_user: dict = Depends(get_current_user)):
+async def get_patients(
+    response: Response,
+    page: PageParams = Depends(),
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Name or email prefix, case-insensitive"),
+    current_user: dict = Depends(get_current_user),
+):
     if current_user.get('role') != 'clinic':
         raise HTTPException(status_code=403, detail="Only clinic personnel can access this.")
     try:
-        patients_ref = db.collection('users').where('role', '==', 'patient').stream()
-        patient_list = []
-        for doc in patients_ref:
-            doc_data = doc.to_dict()
-            if 'name' in doc_data and 'email' in doc_data:
-                patient_list.append({"uid": doc.id, **doc_data})
+        # Served from memory while the patient index listener is in sync
+        if q and not PATIENT_INDEX_ENABLED:
+            raise HTTPException(status_code=501, detail="Patient search needs the patient index, which is disabled.")
+        indexed = patient_index.page(page.page_size, page.page_token, q) if PATIENT_INDEX_ENABLED else None
+        if indexed is not None:
+            patient_list, next_page_token = indexed
+        elif q:
+            raise HTTPException(status_code=503, detail="Patient search is not available yet; please retry.", headers={"Retry-After": "5"})
+        else:
+            patient_list, next_page_token = await data_access.list_patients(page.page_size, page.page_token)
+        set_next_page_token(response, next_page_token)
         return patient_list
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching patients: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An error occurred while fetching patients.")
 
-def simulate_ai_model(filename: str):
-    print(f"--- Simulating AI analysis for file: {filename} ---")
-    risk_level = random.choice(['high', 'low', 'low'])
-    if risk_level == 'high':
-        confidence = random.randint(80, 95)
-        report_text = f"Model analysis indicates a high probability ({confidence}%) of significant stenosis. Immediate review by a senior specialist is recommended."
-    else:
-        confidence = random.randint(60, 79)
-        report_text = f"Model analysis indicates a low to moderate probability ({confidence}%) of stenosis. A routine check by a junior doctor is advised."
-    print(f"--- Simulation Result: Risk Level='{risk_level}' ---")
-    return {"riskLevel": risk_level, "modelReport": report_text}
-
-@app.post("/cases")
-async def create_case(patientName: str = Form(...), patientEmail: str = Form(...), file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+# --- Storage Helpers ---
+SIGNED_UPLOAD_URL_TTL = timedelta(minutes=int(os.getenv("SIGNED_UPLOAD_URL_TTL_MINUTES", "30")))
+SIGNED_DOWNLOAD_URL_TTL = timedelta(minutes=int(os.getenv("SIGNED_DOWNLOAD_URL_TTL_MINUTES", "15")))
+MAX_DICOM_UPLOAD_BYTES = int(os.getenv("MAX_DICOM_UPLOAD_BYTES", str(2 * 1024 ** 3)))
+def max_items(limit: int, limiter) -> int:
+    # A bulk request above its limiter's burst could never be let through
+    return min(limit, int(limiter.burst)) if RATE_LIMIT_ENABLED else limit
+
+BULK_MAX_ITEMS = max_items(int(os.getenv("BULK_MAX_ITEMS", "500")), bulk_case_limiter)
+
+def get_storage_bucket_name() -> str:
+    bucket_name = os.getenv("FIREBASE_STORAGE_BUCKET")
+    if not bucket_name:
+        raise ValueError("FIREBASE_STORAGE_BUCKET environment variable not set.")
+    return bucket_name
+
+def build_case_data(patientName: str, patientEmail: str, model_result: dict, **file_fields) -> dict:
+    status = "pending_senior_review" if model_result["riskLevel"] == "high" else "pending_junior_review"
+    return {
+        "patientName": patientName,
+        "patientEmail": patientEmail,
+        **file_fields,
+        "status": status,
+        "modelReport": model_result["modelReport"],
+        "createdAt": firestore.SERVER_TIMESTAMP,
+        "updatedAt": firestore.SERVER_TIMESTAMP
+    }
+
+def parse_upload_path(object_path: str, uid: str):
+    """
+    Returns (case_id, filename) for an object path issued to `uid` by
+    POST /cases/upload-url or POST /cases/bulk, or None.
+    """
+    parts = object_path.split("/")
+    if len(parts) != 4 or parts[0] != "dicom_uploads" or parts[1] != uid:
+        return None
+    return parts[2], parts[3]
+
+# The multipart body is parsed by hand so the DICOM file can be streamed to GCS
+CREATE_CASE_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["patientName", "patientEmail", "file"],
+                    "properties": {
+                        "patientName": {"type": "string"},
+                        "patientEmail": {"type": "string"},
+                        "file": {"type": "string", "format": "binary"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+@app.post("/cases", openapi_extra=CREATE_CASE_FORM_SCHEMA)
+async def create_case(request: Request, current_user: dict = Depends(rate_limited(case_upload_limiter))):
     if current_user.get('role') != 'clinic':
         raise HTTPException(status_code=403, detail="Only clinic personnel can perform this action.")
     try:
-        simulation_result = simulate_ai_model(file.filename)
-        risk_level = simulation_result["riskLevel"]
-        model_report = simulation_result["modelReport"]
-        
-        bucket_name = os.getenv("FIREBASE_STORAGE_BUCKET")
-        if not bucket_name:
-            raise ValueError("FIREBASE_STORAGE_BUCKET environment variable not set.")
-        bucket = storage.bucket(bucket_name)
-        unique_filename = f"{uuid.uuid4()}-{file.filename}"
-        blob = bucket.blob(f"dicom_files/{unique_filename}")
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        blob.make_public()
-        
-        status = "pending_senior_review" if risk_level == "high" else "pending_junior_review"
-        case_data = {
-            "patientName": patientName,
-            "patientEmail": patientEmail,
-            "dicomFileUrl": blob.public_url,
-            "status": status,
-            "modelReport": model_report,
-            "createdAt": firestore.SERVER_TIMESTAMP
-        }
-        db.collection("cases").add(case_data)
+        bucket_name = get_storage_bucket_name()
+        try:
+            form = StreamingFormParser(request.headers.get("content-type", ""))
+            object_path, _ = await data_access.stream_form_upload(
+                request.stream(), form, bucket_name, "dicom_files", MAX_DICOM_UPLOAD_BYTES
+            )
+        except FormError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        patientName = form.fields.get("patientName")
+        patientEmail = form.fields.get("patientEmail")
+        if object_path is None or not patientName or not patientEmail:
+            if object_path is not None:
+                await data_access.delete_blob(bucket_name, object_path)
+            raise HTTPException(status_code=422, detail="patientName, patientEmail and file are required.")
+
+        model_result = await inference_engine.predict({"filename": form.filename, "bucket": bucket_name, "objectPath": object_path})
+
+        public_url = await data_access.make_blob_public(bucket_name, object_path)
+
+        case_data = build_case_data(patientName, patientEmail, model_result, dicomFileUrl=public_url)
+        await data_access.add_case(case_data)
         return {"message": "Case created and sent for analysis successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create case: {str(e)}")
+
+@app.post("/cases/upload-url")
+async def create_case_upload_url(upload: UploadUrlRequest, current_user: dict = Depends(rate_limited(case_upload_limiter))):
+    """
+    Phase one of a direct upload: returns a V4 signed URL that opens a
+    resumable upload session straight to Cloud Storage. The client POSTs to
+    `uploadUrl` with `headers`, then PUTs the file to the session URI GCS
+    returns in the Location header.
+    """
+    if current_user.get('role') != 'clinic':
+        raise HTTPException(status_code=403, detail="Only clinic personnel can perform this action.")
+    try:
+        upload_id = uuid.uuid4().hex
+        filename = os.path.basename(upload.filename) or "upload.dcm"
+        object_path = f"dicom_uploads/{current_user['uid']}/{upload_id}/{filename}"
+        upload_url = await data_access.generate_upload_url(
+            get_storage_bucket_name(), object_path, upload.contentType, SIGNED_UPLOAD_URL_TTL
+        )
+        return {
+            "uploadUrl": upload_url,
+            "method": "POST",
+            "headers": {"x-goog-resumable": "start", "Content-Type": upload.contentType},
+            "objectPath": object_path,
+            "expiresAt": (datetime.now(timezone.utc) + SIGNED_UPLOAD_URL_TTL).isoformat(),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create upload URL: {str(e)}")
+
+@app.post("/cases/finalize")
+async def finalize_case_upload(upload: FinalizeCaseRequest, current_user: dict = Depends(rate_limited(case_upload_limiter))):
+    """
+    Phase two of a direct upload: checks the stored object's size and
+    CRC32C against what the client sent, then creates the case. The
+    object stays private; use GET /cases/{case_id}/dicom-url to read it.
+    """
+    if current_user.get('role') != 'clinic':
+        raise HTTPException(status_code=403, detail="Only clinic personnel can perform this action.")
+    parsed = parse_upload_path(upload.objectPath, current_user['uid'])
+    if parsed is None:
+        raise HTTPException(status_code=400, detail="objectPath was not issued to this user.")
+    case_id, filename = parsed
+    try:
+        bucket_name = get_storage_bucket_name()
+        metadata = await data_access.get_blob_metadata(bucket_name, upload.objectPath)
+        if metadata is None:
+            raise HTTPException(status_code=404, detail="Uploaded file not found.")
+        if metadata["size"] > MAX_DICOM_UPLOAD_BYTES:
+            await data_access.delete_blob(bucket_name, upload.objectPath)
+            raise HTTPException(status_code=413, detail="Uploaded file is too large.")
+        if metadata["size"] != upload.size or metadata["crc32c"] != upload.crc32c:
+            raise HTTPException(status_code=409, detail="Uploaded file does not match the expected size and checksum.")
+
+        model_result = await inference_engine.predict({"filename": filename, "bucket": bucket_name, "objectPath": upload.objectPath})
+        case_data = build_case_data(
+            upload.patientName, upload.patientEmail, model_result,
+            dicomFilePath=upload.objectPath, dicomFileSize=metadata["size"], dicomFileCrc32c=metadata["crc32c"],
+        )
+        await data_access.create_case(case_id, case_data)
+        return {"message": "Case created and sent for analysis successfully", "caseId": case_id}
+    except AlreadyExists:
+        raise HTTPException(status_code=409, detail="This upload has already been finalized.")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create case: {str(e)}")
 
+# --- Bulk Ingestion ---
+BULK_CASE_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["manifest", "files"],
+                    "properties": {
+                        "manifest": {
+                            "type": "string",
+                            "description": "JSON list of {patientName, patientEmail}, one per file in order. Must come before the files.",
+                        },
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                }
+            }
+        },
+    }
+}
+
+async def ingest_cases(items: list, bucket_name: str, discard_failed: bool = False):
+    """
+    Runs inference on every item without an error so far, letting the
+    engine batch them, then creates all the cases with one BulkWriter.
+    Failures are recorded on the item's "error". With `discard_failed`,
+    the stored objects of items that fail here are deleted and their
+    "objectPath" cleared; otherwise the client can retry them through
+    POST /cases/finalize.
+    """
+    ready = [item for item in items if item["error"] is None]
+    results = await asyncio.gather(
+        *(inference_engine.predict({"filename": item["filename"], "bucket": bucket_name, "objectPath": item["objectPath"]})
+          for item in ready),
+        return_exceptions=True,
+    )
+    cases = []
+    for item, model_result in zip(ready, results):
+        if isinstance(model_result, Exception):
+            item["error"] = f"Inference failed: {model_result}"
+            continue
+        cases.append((item["caseId"], build_case_data(item["patientName"], item["patientEmail"], model_result, **item["fileFields"])))
+    if cases:
+        write_errors = await data_access.bulk_create_cases(cases)
+        for item in ready:
+            if write_errors.get(item["caseId"]):
+                item["error"] = write_errors[item["caseId"]]
+    failed = [item for item in ready if item["error"] is not None]
+    if discard_failed and failed:
+        await data_access.discard_uploads(bucket_name, [{"objectPath": item["objectPath"], "metadata": item["fileFields"]} for item in failed])
+        for item in failed:
+            item["objectPath"] = None
+
+def bulk_report(items: list, started: float) -> dict:
+    elapsed = time.perf_counter() - started
+    created = sum(1 for item in items if item["error"] is None)
+    print(f"✅ Bulk Ingestion: Created {created}/{len(items)} case(s) in {elapsed:.2f}s")
+    return {
+        "items": [
+            {
+                "index": item["index"],
+                "filename": item["filename"],
+                "status": "created" if item["error"] is None else "failed",
+                "caseId": item["caseId"] if item["error"] is None else None,
+                "objectPath": item["objectPath"],
+                "error": item["error"],
+            }
+            for item in items
+        ],
+        "created": created,
+        "failed": len(items) - created,
+        "elapsedSeconds": round(elapsed, 3),
+        "casesPerSecond": round(created / elapsed, 2) if elapsed > 0 else None,
+    }
+
+@app.post("/cases/bulk", openapi_extra=BULK_CASE_FORM_SCHEMA)
+async def create_cases_bulk(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Ingests many studies in one multipart request: a `manifest` field
+    followed by one `files` part per study. Each file is streamed to its
+    own Cloud Storage upload, with up to BULK_UPLOAD_CONCURRENCY in flight.
+    Returns a status per file and the overall throughput; the stored
+    objects of files that fail are deleted. Takes one token per manifest
+    entry from the clinic's bulk cases bucket.
+    """
+    if current_user.get('role') != 'clinic':
+        raise HTTPException(status_code=403, detail="Only clinic personnel can perform this action.")
+    started = time.perf_counter()
+    case_ids = {}
+    manifest = []
+
+    async def object_path_for(index: int, filename: str) -> str:
+        # Checked on the first file, so a bad manifest fails before anything is uploaded
+        if index == 0:
+            if "manifest" not in form.fields:
+                raise FormError("The manifest field must come before the files.")
+            try:
+                manifest.extend(TypeAdapter(List[BulkCaseItem]).validate_json(form.fields["manifest"]))
+            except ValidationError as e:
+                raise FormError(f"Invalid manifest: {e.errors(include_url=False)}")
+            await take_rate_limit(bulk_case_limiter, current_user, max(1, min(len(manifest), BULK_MAX_ITEMS)))
+        if index >= min(len(manifest), BULK_MAX_ITEMS):
+            raise FormError(f"Got more files than manifest entries (limit {BULK_MAX_ITEMS}).")
+        case_ids[index] = uuid.uuid4().hex
+        return f"dicom_uploads/{current_user['uid']}/{case_ids[index]}/{os.path.basename(filename) or 'upload.dcm'}"
+
+    try:
+        bucket_name = get_storage_bucket_name()
+        try:
+            form = MultiFileFormParser(request.headers.get("content-type", ""))
+            uploads = await data_access.stream_bulk_form_upload(
+                request.stream(), form, bucket_name, object_path_for, max_bytes=MAX_DICOM_UPLOAD_BYTES
+            )
+        except FormError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not uploads or len(uploads) != len(manifest):
+            await data_access.discard_uploads(bucket_name, uploads)
+            raise HTTPException(status_code=422, detail="Send one file per manifest entry.")
+
+        items = []
+        for upload, entry in zip(uploads, manifest):
+            metadata = upload["metadata"] or {}
+            items.append({
+                "index": upload["index"],
+                "filename": upload["filename"],
+                "caseId": case_ids.get(upload["index"]),
+                # A failed upload leaves no object behind
+                "objectPath": upload["objectPath"] if upload["error"] is None else None,
+                "patientName": entry.patientName,
+                "patientEmail": entry.patientEmail,
+                "fileFields": {
+                    "dicomFilePath": upload["objectPath"],
+                    "dicomFileSize": int(metadata.get("size", 0)),
+                    "dicomFileCrc32c": metadata.get("crc32c"),
+                },
+                "error": upload["error"],
+            })
+        await ingest_cases(items, bucket_name, discard_failed=True)
+        return bulk_report(items, started)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to ingest cases: {str(e)}")
+
+@app.post("/cases/bulk/finalize")
+async def finalize_cases_bulk(bulk: BulkFinalizeRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Bulk form of POST /cases/finalize for studies the client already sent
+    straight to Cloud Storage through POST /cases/upload-url. The stored
+    objects are checked concurrently. Returns a status per item and the
+    overall throughput. A failed item keeps its object and objectPath so
+    it can be retried through POST /cases/finalize, except an oversized
+    one, which is deleted. Takes one token per item from the clinic's bulk
+    cases bucket.
+    """
+    if current_user.get('role') != 'clinic':
+        raise HTTPException(status_code=403, detail="Only clinic personnel can perform this action.")
+    if not bulk.items or len(bulk.items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"Send between 1 and {BULK_MAX_ITEMS} items.")
+    await take_rate_limit(bulk_case_limiter, current_user, len(bulk.items))
+    started = time.perf_counter()
+    try:
+        bucket_name = get_storage_bucket_name()
+        slots = asyncio.Semaphore(data_access.BULK_UPLOAD_CONCURRENCY)
+
+        async def check(index: int, upload: FinalizeCaseRequest) -> dict:
+            parsed = parse_upload_path(upload.objectPath, current_user['uid'])
+            item = {
+                "index": index,
+                "filename": parsed[1] if parsed else None,
+                "caseId": parsed[0] if parsed else None,
+                "objectPath": upload.objectPath,
+                "patientName": upload.patientName,
+                "patientEmail": upload.patientEmail,
+                "fileFields": {"dicomFilePath": upload.objectPath, "dicomFileSize": upload.size, "dicomFileCrc32c": upload.crc32c},
+                "error": None if parsed else "objectPath was not issued to this user.",
+            }
+            if parsed:
+                async with slots:
+                    metadata = await data_access.get_blob_metadata(bucket_name, upload.objectPath)
+                if metadata is None:
+                    item["error"] = "Uploaded file not found."
+                elif metadata["size"] > MAX_DICOM_UPLOAD_BYTES:
+                    # Deleted, as POST /cases/finalize does
+                    await data_access.discard_uploads(bucket_name, [{"objectPath": upload.objectPath, "metadata": metadata}])
+                    item["error"] = "Uploaded file is too large."
+                elif metadata["size"] != upload.size or metadata["crc32c"] != upload.crc32c:
+                    item["error"] = "Uploaded file does not match the expected size and checksum."
+            return item
+
+        items = await asyncio.gather(*(check(index, upload) for index, upload in enumerate(bulk.items)))
+        seen = set()
+        for item in items:
+            if item["error"] is None and item["caseId"] in seen:
+                item["error"] = "Duplicate objectPath in this request."
+            seen.add(item["caseId"])
+        await ingest_cases(items, bucket_name)
+        return bulk_report(items, started)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to ingest cases: {str(e)}")
+
+@app.get("/cases/{case_id}/dicom-url")
+async def get_case_dicom_url(case_id: str, current_user: dict = Depends(get_current_user)):
+    role = current_user.get('role')
+    if role not in ['clinic', 'junior_doctor', 'senior_doctor', 'patient']:
+        raise HTTPException(status_code=403, detail="Access denied.")
+    case = await data_access.get_case(case_id)
+    if case is None:
+        raise HTTPException(status_code=404, detail="Case not found.")
+    if role == 'patient' and case.get('patientEmail') != current_user.get('email'):
+        raise HTTPException(status_code=403, detail="Access denied.")
+    if 'dicomFilePath' not in case:
+        # Cases uploaded through POST /cases have a public URL
+        return {"url": case.get('dicomFileUrl')}
+    url = await data_access.generate_download_url(get_storage_bucket_name(), case['dicomFilePath'], SIGNED_DOWNLOAD_URL_TTL)
+    return {"url": url, "expiresAt": (datetime.now(timezone.utc) + SIGNED_DOWNLOAD_URL_TTL).isoformat()}
+
 @app.get("/cases")
-async def get_cases(current_user: dict = Depends(get_current_user)):
+async def get_cases(request: Request, page: PageParams = Depends(), fields: Optional[List[str]] = Depends(parse_case_fields), current_user: dict = Depends(get_current_user)):
     role = current_user.get('role')
     if role not in ['junior_doctor', 'senior_doctor']:
         raise HTTPException(status_code=403, detail="Access denied.")
     status_to_fetch = "pending_junior_review" if role == 'junior_doctor' else "pending_senior_review"
-    cases_ref = db.collection('cases').where('status', '==', status_to_fetch).stream()
-    
-    # Manually format timestamp to ensure consistency
-    case_list = []
-    for doc in cases_ref:
-        data = doc.to_dict()
-        if 'createdAt' in data and hasattr(data['createdAt'], 'timestamp'):
-            ts = data['createdAt'].timestamp()
-            data['createdAt'] = {'_seconds': int(ts), '_nanoseconds': int((ts - int(ts)) * 1e9)}
-        case_list.append({"id": doc.id, **data})
-    return case_list
+    try:
+        # Served from memory while the worklist listener is in sync
+        cached = worklist.page(status_to_fetch, page.page_size, page.page_token, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cached is not None:
+        case_list, next_page_token = cached
+        return case_list_response(request, case_list, next_page_token)
+
+    try:
+        cases, next_page_token = await data_access.list_cases('status', status_to_fetch, page.page_size, page.page_token, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return case_list_response(request, cases_to_api(cases), next_page_token)
 
 @app.get("/my-cases")
-async def get_my_cases(current_user: dict = Depends(get_current_user)):
+async def get_my_cases(request: Request, page: PageParams = Depends(), fields: Optional[List[str]] = Depends(parse_case_fields), current_user: dict = Depends(get_current_user)):
     if current_user.get('role') != 'patient':
         raise HTTPException(status_code=403, detail="Access denied.")
 
-    cases_ref = db.collection('cases').where('patientEmail', '==', current_user['email']).stream()
-    
-    # Manually format timestamp to ensure consistency
-    case_list = []
-    for doc in cases_ref:
-        data = doc.to_dict()
-        if 'createdAt' in data and hasattr(data['createdAt'], 'timestamp'):
-            ts = data['createdAt'].timestamp()
-            data['createdAt'] = {'_seconds': int(ts), '_nanoseconds': int((ts - int(ts)) * 1e9)}
-        case_list.append({"id": doc.id, **data})
-    return case_list
+    try:
+        cases, next_page_token = await data_access.list_cases('patientEmail', current_user['email'], page.page_size, page.page_token, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return case_list_response(request, cases_to_api(cases), next_page_token)
+
+def format_sse(event_id: str, event_type: str, payload: dict) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {encode_json(payload).decode()}\n\n"
+
+@app.post("/cases/events/ticket")
+async def create_stream_ticket(current_user: dict = Depends(get_current_user)):
+    """
+    Returns a single-use ticket for GET /cases/events?ticket=..., for
+    clients such as EventSource that cannot send an Authorization header.
+    """
+    ticket = await _auth_cache_call(auth_cache.issue_ticket, current_user)
+    return {"ticket": ticket, "expiresIn": STREAM_TICKET_TTL_SECONDS}
+
+@app.get("/cases/events")
+async def stream_case_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    lastEventId: Optional[str] = None,
+    current_user: dict = Depends(get_stream_user),
+):
+    """
+    Server-Sent Events stream of case changes relevant to the caller:
+    patients get their own cases, doctors get cases entering or leaving
+    their review queue. Reconnecting with Last-Event-ID (sent automatically
+    by EventSource) replays missed events; a "reset" event means the client
+    must refetch its list with GET /cases or GET /my-cases. Browsers
+    authenticate with a ticket from POST /cases/events/ticket, and need a
+    new one for every reconnect.
+    """
+    if not CASE_EVENTS_ENABLED:
+        raise HTTPException(status_code=503, detail="Case events are disabled.")
+    subscription, reset = case_events.subscribe(matches_user(current_user), last_event_id or lastEventId)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if reset:
+                yield format_sse(f"{case_events.epoch}-{subscription.last_seq}", "reset", {})
+            while not await request.is_disconnected():
+                try:
+                    event = await subscription.next_event(CASE_EVENTS_KEEPALIVE_SECONDS)
+                except EOFError:
+                    # The client fell too far behind; it reconnects and resumes from its last id
+                    break
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                payload = {key: event[key] for key in ("type", "caseId", "status", "previousStatus", "case")}
+                yield format_sse(event["id"], "case", payload)
+        finally:
+            case_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.put("/cases/{case_id}/review")
-async def review_case(case_id: str, review: CaseReview, current_user: dict = Depends(get_current_user)):
+async def review_case(case_id: str, review: CaseReview, current_user: dict = Depends(rate_limited(review_limiter))):
     doctor_role = current_user.get('role')
     if doctor_role not in ['junior_doctor', 'senior_doctor']:
         raise HTTPException(status_code=403, detail="Only doctors can review cases.")
@@ -188,18 +866,89 @@ async def review_case(case_id: str, review: CaseReview, current_user: dict = Dep
             "decision": review.decision,
             "findings": review.findings,
             "doctor_role": doctor_role,
+            "request_id": request_id_var.get(),
         }
-        print(f"--- Invoking LangGraph workflow with initial state: {initial_state} ---")
-        stenosis_workflow_app.invoke(initial_state)
-        return {"message": "Case review process has been initiated."}
+        job = await data_access.run_blocking(review_queue.enqueue, initial_state)
+        print(f"--- Queued review job {job['id']} with initial state: {initial_state} ---")
+        return {"message": "Case review process has been initiated.", "jobId": job["id"], "status": job["status"]}
+    except ReviewConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start review workflow: {str(e)}")
 
+REVIEW_BATCH_MAX_ITEMS = max_items(int(os.getenv("REVIEW_BATCH_MAX_ITEMS", "100")), bulk_review_limiter)
+
+@app.post("/cases/review-batch")
+async def review_cases_batch(batch: BatchReviewRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Reviews many cases in one request and waits for the workflows to
+    finish. Returns an outcome per case: completed, partial (a side effect
+    failed after others had been made), skipped (the same review already
+    ran), conflict (the same decision was already made with other
+    findings), busy (a queued review job owns the case), not_found or failed.
+    Cases are leased in the review job queue while they run, so a worker
+    never runs the same case at the same time. Takes one token per review
+    from the clinic's bulk reviews bucket.
+    """
+    doctor_role = current_user.get('role')
+    if doctor_role not in ['junior_doctor', 'senior_doctor']:
+        raise HTTPException(status_code=403, detail="Only doctors can review cases.")
+    if not batch.reviews or len(batch.reviews) > REVIEW_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"Send between 1 and {REVIEW_BATCH_MAX_ITEMS} reviews.")
+    case_ids = [review.caseId for review in batch.reviews]
+    if len(set(case_ids)) != len(case_ids):
+        raise HTTPException(status_code=422, detail="Each case can only be reviewed once per batch.")
+    await take_rate_limit(bulk_review_limiter, current_user, len(case_ids))
+    initial_states = [
+        {
+            "case_id": review.caseId,
+            "decision": review.decision,
+            "findings": review.findings,
+            "doctor_role": doctor_role,
+            "request_id": request_id_var.get(),
+        }
+        for review in batch.reviews
+    ]
+    owner, leased = await data_access.run_blocking(review_queue.lease_cases, case_ids)
+    leased = set(leased)
+    try:
+        ran = await data_access.run_blocking(run_reviews, [state for state in initial_states if state["case_id"] in leased])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to run review workflows: {str(e)}")
+    finally:
+        await data_access.run_blocking(review_queue.release_cases, owner)
+    ran = iter(ran)
+    outcomes = [
+        next(ran) if case_id in leased
+        else review_outcome(case_id, "busy", error="A review for this case is already queued or running.")
+        for case_id in case_ids
+    ]
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    print(f"✅ Batch Review: {len(outcomes)} case(s) reviewed: {counts}")
+    return {"results": outcomes, "counts": counts}
+
+@app.get("/review-jobs/{job_id}")
+async def get_review_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    if current_user.get('role') not in ['junior_doctor', 'senior_doctor']:
+        raise HTTPException(status_code=403, detail="Access denied.")
+    job = await data_access.run_blocking(review_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Review job not found.")
+    return {
+        "jobId": job["id"],
+        "caseId": job["case_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "lastError": job["last_error"],
+    }
+
 @app.get("/init-gcp")
 async def init_gcp_auth():
     print("--- Attempting to initialize GCP credentials... ---")
     try:
-        get_gcp_credentials()
+        await data_access.run_blocking(get_gcp_credentials)
         return {"message": "GCP credentials initialized or already exist."}
     except Exception as e:
         return {"message": f"An error occurred: {e}"}
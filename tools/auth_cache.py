@@ -0,0 +1,134 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+from cachetools import TLRUCache, TTLCache
+from dotenv import load_dotenv
+from .shared_state import shared_store
+
+load_dotenv()
+
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+# How long a stream ticket from POST /cases/events/ticket can be redeemed
+STREAM_TICKET_TTL_SECONDS = float(os.getenv("STREAM_TICKET_TTL_SECONDS", "30"))
+
+class AuthCache:
+    """
+    Bounded, thread-safe LRU cache for verified Firebase ID tokens and
+    Firestore user profiles.
+    - Tokens are keyed by a SHA-256 digest of the raw token and never outlive
+      the token's own `exp` claim.
+    - Profiles are keyed by uid and can be invalidated explicitly.
+    - With a `shared` store (multi-worker mode), verified tokens are also
+      written there so other workers skip verification, and profiles live
+      only there so an invalidation reaches every worker at once.
+    - Stream tickets stand in for an ID token where a client cannot send
+      headers (EventSource). Each one is short-lived and works once.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAXSIZE, ttl: float = AUTH_CACHE_TTL_SECONDS, shared=None):
+        self.ttl = ttl
+        self.shared = shared
+        self._tokens = TLRUCache(maxsize=maxsize, ttu=self._token_expiry)
+        self._users = TLRUCache(maxsize=maxsize, ttu=lambda _key, _value, now: now + self.ttl)
+        self._tickets = TTLCache(maxsize=maxsize, ttl=STREAM_TICKET_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self._counters = {"token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0, "invalidations": 0}
+
+    def _token_expiry(self, _key, decoded_token: dict, now: float) -> float:
+        # TLRUCache runs on the monotonic clock while `exp` is wall-clock time,
+        # so convert the remaining token lifetime into a monotonic deadline.
+        remaining = decoded_token.get("exp", 0) - time.time()
+        return now + min(self.ttl, remaining)
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token(self, token: str):
+        key = self._token_key(token)
+        with self._lock:
+            decoded_token = self._tokens.get(key)
+        if decoded_token is None and self.shared is not None:
+            decoded_token = self.shared.get("token", key)
+            if decoded_token is not None:
+                with self._lock:
+                    self._tokens[key] = decoded_token
+        with self._lock:
+            self._counters["token_hits" if decoded_token is not None else "token_misses"] += 1
+        return decoded_token
+
+    def put_token(self, token: str, decoded_token: dict):
+        remaining = decoded_token.get("exp", 0) - time.time()
+        if remaining <= 0:
+            return
+        key = self._token_key(token)
+        with self._lock:
+            self._tokens[key] = decoded_token
+        if self.shared is not None:
+            self.shared.put("token", key, decoded_token, min(self.ttl, remaining))
+
+    def get_user(self, uid: str):
+        if self.shared is not None:
+            profile = self.shared.get("user", uid)
+        else:
+            with self._lock:
+                profile = self._users.get(uid)
+        with self._lock:
+            self._counters["user_hits" if profile is not None else "user_misses"] += 1
+        return profile
+
+    def put_user(self, uid: str, profile: dict):
+        if self.shared is not None:
+            self.shared.put("user", uid, profile, self.ttl)
+            return
+        with self._lock:
+            self._users[uid] = profile
+
+    def invalidate_user(self, uid: str):
+        if self.shared is not None:
+            self.shared.delete("user", uid)
+        with self._lock:
+            self._users.pop(uid, None)
+            self._counters["invalidations"] += 1
+
+    def issue_ticket(self, user: dict) -> str:
+        """
+        Returns a new single-use ticket for an authenticated user.
+        """
+        ticket = secrets.token_urlsafe(32)
+        key = self._token_key(ticket)
+        if self.shared is not None:
+            self.shared.put("ticket", key, user, STREAM_TICKET_TTL_SECONDS)
+        else:
+            with self._lock:
+                self._tickets[key] = user
+        return ticket
+
+    def redeem_ticket(self, ticket: str):
+        """
+        Returns the user a ticket was issued to and invalidates it, or None
+        if it is unknown, expired or already used.
+        """
+        key = self._token_key(ticket)
+        if self.shared is not None:
+            return self.shared.take("ticket", key)
+        with self._lock:
+            return self._tickets.pop(key, None)
+
+    def stats(self) -> dict:
+        shared_users = self.shared.count("user") if self.shared is not None else None
+        with self._lock:
+            return {
+                **self._counters,
+                "token_entries": len(self._tokens),
+                "user_entries": len(self._users) if shared_users is None else shared_users,
+                "maxsize": self._tokens.maxsize,
+                "ttl_seconds": self.ttl,
+                "backend": "memory" if self.shared is None else "sqlite",
+            }
+
+# Process-wide cache shared by all requests (and by all workers when SHARED_STATE_DB is set)
+auth_cache = AuthCache(shared=shared_store)
@@ -0,0 +1,210 @@
+import asyncio
+import collections
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from .data_access import get_db
+from .serialization import format_created_at
+from .snapshot_listener import SnapshotListener
+
+load_dotenv()
+
+# Recent events kept for clients that reconnect with Last-Event-ID
+CASE_EVENTS_BUFFER_SIZE = int(os.getenv("CASE_EVENTS_BUFFER_SIZE", "5000"))
+# Events a single client may fall behind by before its stream is closed
+CASE_EVENTS_CLIENT_QUEUE_SIZE = int(os.getenv("CASE_EVENTS_CLIENT_QUEUE_SIZE", "256"))
+CASE_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("CASE_EVENTS_KEEPALIVE_SECONDS", "15"))
+# Cases whose last status is remembered so events can carry previousStatus
+CASE_EVENTS_KNOWN_CASES = int(os.getenv("CASE_EVENTS_KNOWN_CASES", "100000"))
+# The listener's query covers every case updated since `_since`; replacing it
+# this often moves `_since` forward so Firestore stops tracking older cases
+CASE_EVENTS_LISTENER_REFRESH_SECONDS = float(os.getenv("CASE_EVENTS_LISTENER_REFRESH_SECONDS", "600"))
+
+class Subscription:
+    """
+    One connected client. Events that match `matches(event)` are queued
+    until the client reads them. If the client falls more than `maxsize`
+    events behind, the subscription is marked `overflowed` and dropped from
+    the hub; the client then reconnects and replays from its last event id.
+    """
+
+    def __init__(self, matches, maxsize: int = CASE_EVENTS_CLIENT_QUEUE_SIZE):
+        self.matches = matches
+        self.queue = asyncio.Queue(maxsize)
+        # Buffered events replayed after a reconnect, sent before live ones
+        self.backlog = collections.deque()
+        self.last_seq = 0
+        self.overflowed = False
+
+    async def next_event(self, timeout: float):
+        """
+        Returns the next unseen event, None after `timeout` seconds without
+        one, or raises EOFError once an overflowed queue has been drained.
+        """
+        while True:
+            if self.backlog:
+                event = self.backlog.popleft()
+            elif self.overflowed and self.queue.empty():
+                raise EOFError
+            else:
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            # Events can arrive both in the replayed backlog and live; keep the first copy
+            if event["seq"] > self.last_seq:
+                self.last_seq = event["seq"]
+                return event
+
+class CaseEventHub:
+    """
+    Turns writes to `cases` into an ordered stream of case events for
+    push clients.
+    - A Firestore listener on `updatedAt` picks up every create and status
+      change made after the process started, so the write paths must set
+      `updatedAt`.
+    - Each event gets an id of the form `<epoch>-<seq>`. The last
+      CASE_EVENTS_BUFFER_SIZE events are kept in a ring buffer so a client
+      can resume after a reconnect. A client whose id is too old, or comes
+      from another process, gets a "reset" event and must refetch its list.
+    - Events are built on the listener thread and fanned out to subscriber
+      queues on the event loop.
+    - The listener is replaced every CASE_EVENTS_LISTENER_REFRESH_SECONDS
+      from the newest update seen, so its result set stays small.
+    """
+
+    def __init__(self, buffer_size: int = CASE_EVENTS_BUFFER_SIZE,
+                 refresh_interval: float = CASE_EVENTS_LISTENER_REFRESH_SECONDS):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = collections.deque(maxlen=buffer_size)
+        self._seq = 0
+        self._known = LRUCache(maxsize=CASE_EVENTS_KNOWN_CASES)
+        self._since = datetime.now(timezone.utc)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self.listener = SnapshotListener(
+            "case-events",
+            # Restarts pick up from the newest update seen, so only missed writes are replayed
+            lambda: get_db().collection("cases").where("updatedAt", ">=", self._since),
+            self._on_snapshot,
+            refresh_interval=refresh_interval,
+        )
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.listener.start()
+
+    def stop(self):
+        self.listener.stop()
+
+    def _on_snapshot(self, docs, changes, first: bool):
+        events = []
+        with self._lock:
+            for change in changes:
+                case_id = change.document.id
+                if change.type.name == "REMOVED":
+                    # Only a deleted case leaves an `updatedAt >=` query
+                    data = None
+                else:
+                    data = change.document.to_dict()
+                    updated_at = data.get("updatedAt")
+                    if isinstance(updated_at, datetime) and updated_at > self._since:
+                        self._since = updated_at
+                previous = self._known.get(case_id)
+                status = data.get("status") if data else None
+                # A restarted listener re-reads recent writes; skip what was already sent
+                if previous is not None and data is not None and previous[1] == data.get("updatedAt"):
+                    continue
+                if data is None:
+                    self._known.pop(case_id, None)
+                    patient_email = previous[2] if previous else None
+                else:
+                    patient_email = data.get("patientEmail")
+                    self._known[case_id] = (status, data.get("updatedAt"), patient_email)
+                self._seq += 1
+                event = {
+                    "seq": self._seq,
+                    "id": f"{self.epoch}-{self._seq}",
+                    "type": "removed" if data is None else "upsert",
+                    "caseId": case_id,
+                    "status": status,
+                    "previousStatus": previous[0] if previous else None,
+                    "patientEmail": patient_email,
+                    "case": {"id": case_id, **format_created_at(_without_updated_at(data))} if data else None,
+                }
+                self._events.append(event)
+                events.append(event)
+        if events and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events: list):
+        for subscription in list(self._subscribers):
+            for event in events:
+                if not subscription.matches(event):
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    self._subscribers.discard(subscription)
+                    print(f"--- Case events: dropped a client that fell {subscription.queue.maxsize} events behind ---")
+                    break
+
+    def subscribe(self, matches, last_event_id: str = None):
+        """
+        Registers a client and returns (subscription, reset). Buffered events
+        after `last_event_id` that match are queued for replay; `reset` is
+        True when those events are no longer available.
+        Must be called on the event loop.
+        """
+        subscription = Subscription(matches)
+        reset = False
+        with self._lock:
+            subscription.last_seq = self._seq
+            if last_event_id:
+                epoch, _, seq = last_event_id.partition("-")
+                oldest = self._events[0]["seq"] if self._events else self._seq + 1
+                if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq or int(seq) + 1 < oldest:
+                    reset = True
+                else:
+                    subscription.last_seq = int(seq)
+                    subscription.backlog.extend(event for event in self._events if event["seq"] > int(seq) and matches(event))
+        self._subscribers.add(subscription)
+        return subscription, reset
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "lastSeq": self._seq,
+                "buffered": len(self._events),
+                "subscribers": len(self._subscribers),
+                "listenerActive": self.listener.is_active,
+                "listenerRefreshes": self.listener.refreshes,
+            }
+
+def _without_updated_at(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key != "updatedAt"}
+
+def matches_user(user: dict):
+    """
+    Returns the event filter for a user: patients see their own cases,
+    doctors see cases entering or leaving their review queue. Cases are
+    assigned to a role's queue rather than to one doctor, so a case that
+    has never been in the doctor's queue is not theirs. When the previous
+    status is unknown (the case was last written before this process
+    started), only a case entering the queue is sent.
+    """
+    role = user.get("role")
+    if role in ("junior_doctor", "senior_doctor"):
+        queue = "pending_junior_review" if role == "junior_doctor" else "pending_senior_review"
+        return lambda event: queue in (event["status"], event["previousStatus"])
+    email = user.get("email")
+    return lambda event: event["patientEmail"] == email
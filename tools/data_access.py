@@ -0,0 +1,366 @@
+import asyncio
+import base64
+import contextvars
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from firebase_admin import firestore, firestore_async, storage
+from google.cloud.firestore_v1.field_path import FieldPath
+from dotenv import load_dotenv
+from .gcs_upload import ResumableUploadSession, UploadTooLarge
+from .metrics import traced
+
+load_dotenv()
+
+# Upper bound on threads used for calls that only exist as blocking APIs
+# (GCS uploads, Firebase Auth, Google API clients, the LangGraph run).
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "16"))
+
+# Listing endpoints never return more than MAX_PAGE_SIZE documents per call
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Bulk ingestion: GCS uploads open at once, and attempts per BulkWriter create
+BULK_UPLOAD_CONCURRENCY = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "8"))
+BULK_WRITE_MAX_ATTEMPTS = int(os.getenv("BULK_WRITE_MAX_ATTEMPTS", "5"))
+
+# gRPC codes worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+_RETRIABLE_WRITE_CODES = {4, 8, 10, 13, 14}
+
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a synchronous callable on the bounded blocking-I/O thread pool
+    so it never stalls the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    # Copy the context so the request id follows the call onto the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_blocking_pool, partial(context.run, func, *args, **kwargs))
+
+def get_db():
+    """
+    Returns the synchronous Firestore client, for code that already runs
+    off the event loop (LangGraph nodes, worker threads).
+    """
+    return firestore.client()
+
+def get_async_db():
+    """
+    Returns the asyncio Firestore client used by the API handlers.
+    """
+    return firestore_async.client()
+
+# --- Pagination ---
+def encode_page_token(value, doc_id: str) -> str:
+    """
+    Packs the last document's sort value and id into an opaque page token.
+    """
+    if isinstance(value, datetime):
+        value = {"ts": value.isoformat()}
+    return base64.urlsafe_b64encode(json.dumps({"v": value, "id": doc_id}).encode()).decode()
+
+def decode_page_token(token: str):
+    """
+    Returns (sort value, document id) from a page token, or raises ValueError.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        value = data["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["ts"])
+        return value, data["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid page token.") from e
+
+async def _paginate(query, order_field: str, direction: str, page_size: int, page_token=None, fields=None):
+    """
+    Runs one page of `query` ordered by `order_field` then document id, and
+    returns ([(doc_id, data), ...], next_page_token). The composite indexes
+    these orderings need are listed in firestore.indexes.json.
+    """
+    query = query.order_by(order_field, direction=direction).order_by(FieldPath.document_id(), direction=direction)
+    if fields:
+        # The sort field is always read so the next cursor can be built
+        query = query.select(sorted(set(fields) | {order_field}))
+    if page_token:
+        value, doc_id = decode_page_token(page_token)
+        query = query.start_after({order_field: value, FieldPath.document_id(): doc_id})
+
+    # One extra document tells us whether another page exists
+    docs = [doc async for doc in query.limit(page_size + 1).stream()]
+    next_page_token = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        next_page_token = encode_page_token(docs[-1].get(order_field), docs[-1].id)
+
+    results = []
+    for doc in docs:
+        data = doc.to_dict()
+        if fields:
+            data = {key: value for key, value in data.items() if key in fields}
+        results.append((doc.id, data))
+    return results, next_page_token
+
+# --- Users ---
+@traced("firestore")
+async def get_user_profile(uid: str):
+    user_doc = await get_async_db().collection("users").document(uid).get()
+    return user_doc.to_dict() if user_doc.exists else None
+
+@traced("firestore")
+async def set_user_profile(uid: str, data: dict):
+    await get_async_db().collection("users").document(uid).set(data)
+
+@traced("firestore")
+async def list_patients(page_size: int = DEFAULT_PAGE_SIZE, page_token=None):
+    """
+    Returns one page of patients ordered by name, and the next page token.
+    """
+    query = get_async_db().collection("users").where("role", "==", "patient")
+    docs, next_page_token = await _paginate(query, "name", firestore.Query.ASCENDING, page_size, page_token)
+    patient_list = [{"uid": uid, **data} for uid, data in docs if "name" in data and "email" in data]
+    return patient_list, next_page_token
+
+# --- Cases ---
+@traced("firestore")
+async def list_cases(field: str, value, page_size: int = DEFAULT_PAGE_SIZE, page_token=None, fields=None):
+    """
+    Returns one page of (case_id, data) pairs where `field == value`, newest
+    first, and the next page token. `fields` limits the returned fields.
+    """
+    query = get_async_db().collection("cases").where(field, "==", value)
+    return await _paginate(query, "createdAt", firestore.Query.DESCENDING, page_size, page_token, fields)
+
+@traced("firestore")
+async def get_case(case_id: str):
+    case_doc = await get_async_db().collection("cases").document(case_id).get()
+    return case_doc.to_dict() if case_doc.exists else None
+
+@traced("firestore")
+async def add_case(case_data: dict):
+    _, case_ref = await get_async_db().collection("cases").add(case_data)
+    return case_ref.id
+
+@traced("firestore")
+async def create_case(case_id: str, case_data: dict):
+    """
+    Writes a case under a caller-chosen id. Raises AlreadyExists if the
+    case was already created, which makes finalizing idempotent.
+    """
+    await get_async_db().collection("cases").document(case_id).create(case_data)
+
+def _bulk_create_cases(cases: list) -> dict:
+    errors = {case_id: None for case_id, _ in cases}
+    db = get_db()
+    writer = db.bulk_writer()
+
+    def on_write_error(failure, _writer):
+        if failure.code in _RETRIABLE_WRITE_CODES and failure.attempts < BULK_WRITE_MAX_ATTEMPTS:
+            return True
+        errors[failure.operation.reference.id] = failure.message or f"Write failed with code {failure.code}"
+        return False
+
+    writer.on_write_error(on_write_error)
+    for case_id, case_data in cases:
+        writer.create(db.collection("cases").document(case_id), case_data)
+    writer.close()
+    return errors
+
+@traced("firestore")
+async def bulk_create_cases(cases: list) -> dict:
+    """
+    Creates many (case_id, data) documents with a BulkWriter, which batches
+    and rate-limits the writes and retries transient failures. Returns
+    {case_id: None on success, or an error message}.
+    """
+    return await run_blocking(_bulk_create_cases, cases)
+
+# --- Storage ---
+async def stream_form_upload(body, form, bucket_name: str, folder: str, max_bytes: int = None):
+    """
+    Feeds an async iterator of request body bytes through a
+    StreamingFormParser and streams the file part straight into a GCS
+    resumable upload. Returns (object_path, object_metadata), or
+    (None, None) if the form had no file.
+    Raises UploadTooLarge as soon as the file goes over `max_bytes`. On any
+    error the unfinished upload is cancelled.
+    """
+    session = None
+    object_path = None
+    try:
+        async for data in body:
+            for chunk in form.feed(data):
+                if session is None:
+                    object_path = f"{folder}/{uuid.uuid4()}-{form.filename}"
+                    session = await run_blocking(ResumableUploadSession.start, bucket_name, object_path, form.file_content_type)
+                if max_bytes is not None and session.size + len(chunk) > max_bytes:
+                    raise UploadTooLarge(f"File is larger than {max_bytes} bytes.")
+                session.append(chunk)
+            if session is not None and session.ready():
+                await run_blocking(session.flush)
+        form.close()
+    except Exception:
+        if session is not None:
+            await discard_uploads(bucket_name, [{"objectPath": object_path, "session": session, "metadata": None}])
+        raise
+    if session is None:
+        return None, None
+    return object_path, await run_blocking(session.finish)
+
+async def discard_uploads(bucket_name: str, uploads):
+    """
+    Removes what a failed request already sent to GCS: finished objects
+    (those with metadata) are deleted and open sessions are cancelled.
+    Errors are logged, not raised, so the original failure is reported.
+    """
+    async def discard(upload):
+        try:
+            if upload.get("metadata") is not None:
+                await delete_blob(bucket_name, upload["objectPath"])
+            elif upload.get("session") is not None:
+                await run_blocking(upload["session"].cancel)
+        except Exception as e:
+            print(f"❌ GCS Error: Failed to discard upload {upload['objectPath']}. Error: {e}")
+
+    await asyncio.gather(*(discard(upload) for upload in uploads))
+
+async def stream_bulk_form_upload(body, form, bucket_name: str, object_path_for, max_concurrent: int = BULK_UPLOAD_CONCURRENCY,
+                                  max_bytes: int = None):
+    """
+    Streams every file part of a MultiFileFormParser into its own GCS
+    resumable upload at `await object_path_for(index, filename)`. Parts arrive one
+    after another, so earlier uploads finish in the background while the
+    next file is received; at most `max_concurrent` are open at once.
+    Returns one dict per file part with objectPath, metadata and error.
+    - A file that goes over `max_bytes` has its upload cancelled and gets
+      an error; the rest of that part is read and dropped.
+    - If the request fails part-way, every upload it made is discarded.
+    """
+    slots = asyncio.Semaphore(max_concurrent)
+    uploads = {}
+    tasks = []
+    current = None
+    failed = False
+
+    async def finish(upload):
+        try:
+            if upload["error"] is None:
+                upload["metadata"] = await run_blocking(upload["session"].finish)
+        except Exception as e:
+            upload["error"] = str(e)
+        finally:
+            slots.release()
+
+    try:
+        async for data in body:
+            for index, chunk in form.feed(data):
+                if current is None or current["index"] != index:
+                    if current is not None:
+                        tasks.append(asyncio.create_task(finish(current)))
+                        current = None
+                    await slots.acquire()
+                    file_info = form.files[index]
+                    current = uploads[index] = {
+                        "index": index,
+                        "objectPath": await object_path_for(index, file_info["filename"]),
+                        "metadata": None,
+                        "error": None,
+                    }
+                    try:
+                        current["session"] = await run_blocking(
+                            ResumableUploadSession.start, bucket_name, current["objectPath"], file_info["contentType"]
+                        )
+                    except Exception as e:
+                        current["error"] = str(e)
+                if current["error"] is None and max_bytes is not None and current["session"].size + len(chunk) > max_bytes:
+                    current["error"] = f"File is larger than {max_bytes} bytes."
+                    await discard_uploads(bucket_name, [current])
+                if current["error"] is None:
+                    current["session"].append(chunk)
+            # One flush at a time keeps memory bounded and pushes back on the client
+            if current is not None and current["error"] is None and current["session"].ready():
+                try:
+                    await run_blocking(current["session"].flush)
+                except Exception as e:
+                    current["error"] = str(e)
+        form.close()
+    except BaseException:
+        # The partially received file is never finished; its session is cancelled below
+        failed = True
+        raise
+    finally:
+        if current is not None and not failed:
+            tasks.append(asyncio.create_task(finish(current)))
+        await asyncio.gather(*tasks)
+        if failed:
+            await discard_uploads(bucket_name, [upload for upload in uploads.values() if upload["error"] is None])
+
+    results = []
+    for index, file_info in enumerate(form.files):
+        upload = uploads.get(index) or {"index": index, "objectPath": None, "metadata": None, "error": "File is empty."}
+        upload.pop("session", None)
+        results.append({**upload, "filename": file_info["filename"]})
+    return results
+
+def _make_blob_public(bucket_name: str, path: str):
+    blob = storage.bucket(bucket_name).blob(path)
+    blob.make_public()
+    return blob.public_url
+
+@traced("gcs")
+async def make_blob_public(bucket_name: str, path: str):
+    """
+    Makes an uploaded object public and returns its URL. The storage
+    client is synchronous only, so this runs on the blocking pool.
+    """
+    return await run_blocking(_make_blob_public, bucket_name, path)
+
+def _generate_upload_url(bucket_name: str, path: str, content_type: str, expiration: timedelta):
+    blob = storage.bucket(bucket_name).blob(path)
+    # A signed POST with `x-goog-resumable: start` opens a resumable upload
+    # session; the client then PUTs the bytes to the returned session URI.
+    return blob.generate_signed_url(
+        version="v4",
+        expiration=expiration,
+        method="POST",
+        headers={"x-goog-resumable": "start", "Content-Type": content_type},
+    )
+
+@traced("gcs")
+async def generate_upload_url(bucket_name: str, path: str, content_type: str, expiration: timedelta):
+    """
+    Returns a V4 signed URL that starts a resumable upload of `path`.
+    """
+    return await run_blocking(_generate_upload_url, bucket_name, path, content_type, expiration)
+
+def _generate_download_url(bucket_name: str, path: str, expiration: timedelta):
+    return storage.bucket(bucket_name).blob(path).generate_signed_url(version="v4", expiration=expiration, method="GET")
+
+@traced("gcs")
+async def generate_download_url(bucket_name: str, path: str, expiration: timedelta):
+    """
+    Returns a short-lived V4 signed URL for reading a private object.
+    """
+    return await run_blocking(_generate_download_url, bucket_name, path, expiration)
+
+def _get_blob_metadata(bucket_name: str, path: str):
+    blob = storage.bucket(bucket_name).get_blob(path)
+    if blob is None:
+        return None
+    return {"size": blob.size, "crc32c": blob.crc32c, "contentType": blob.content_type}
+
+@traced("gcs")
+async def get_blob_metadata(bucket_name: str, path: str):
+    """
+    Returns the size, CRC32C and content type of an object, or None if it does not exist.
+    """
+    return await run_blocking(_get_blob_metadata, bucket_name, path)
+
+@traced("gcs")
+async def delete_blob(bucket_name: str, path: str):
+    await run_blocking(lambda: storage.bucket(bucket_name).blob(path).delete())
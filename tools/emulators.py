@@ -0,0 +1,21 @@
+import os
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Project id used when running against the Firebase emulators
+EMULATOR_PROJECT_ID = os.getenv("GCLOUD_PROJECT", "demo-stenosis")
+
+class EmulatorCredential(credentials.Base):
+    """
+    Anonymous credential for the Firestore/Auth emulators and the local
+    stand-ins in benchmarks/, which accept unauthenticated requests.
+    """
+
+    def get_credential(self):
+        return AnonymousCredentials()
+
+def using_firestore_emulator() -> bool:
+    return bool(os.getenv("FIRESTORE_EMULATOR_HOST"))
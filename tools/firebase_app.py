@@ -0,0 +1,28 @@
+import os
+import threading
+import firebase_admin
+from firebase_admin import credentials
+from dotenv import load_dotenv
+from .emulators import EmulatorCredential, EMULATOR_PROJECT_ID, using_firestore_emulator
+
+load_dotenv()
+
+FIREBASE_SERVICE_ACCOUNT_KEY = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY", "serviceAccountKey.json")
+
+_init_lock = threading.Lock()
+
+def init_firebase():
+    """
+    Initializes the default Firebase app once and returns it. Called from
+    the API's lifespan startup rather than at import time, so importing
+    main (scripts, workers, benchmarks) does not need the key file.
+    """
+    with _init_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+        if using_firestore_emulator() and not os.path.exists(FIREBASE_SERVICE_ACCOUNT_KEY):
+            # Local runs against the emulators (see benchmarks/load_test.py) need no service account
+            return firebase_admin.initialize_app(EmulatorCredential(), {"projectId": EMULATOR_PROJECT_ID})
+        return firebase_admin.initialize_app(credentials.Certificate(FIREBASE_SERVICE_ACCOUNT_KEY))
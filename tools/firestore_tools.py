@@ -1,33 +1,55 @@
 
 from firebase_admin import firestore
+from .data_access import get_db
+from .metrics import external_call
 
 def update_case_status_in_db(case_id: str, new_status: str, findings: str = ""):
     """
     Updates the status and findings of a specific case in Firestore.
     """
     try:
-        db = firestore.client()
+        db = get_db()
         case_ref = db.collection("cases").document(case_id)
         
-        update_data = {"status": new_status}
+        # updatedAt feeds the case events listener that pushes changes to clients
+        update_data = {"status": new_status, "updatedAt": firestore.SERVER_TIMESTAMP}
         if findings:
             update_data["findings"] = findings
             
-        case_ref.update(update_data)
+        with external_call("firestore", "update_case"):
+            case_ref.update(update_data)
         print(f"✅ Firestore: Successfully updated case {case_id} to status {new_status}")
         return f"Successfully updated case {case_id}"
     except Exception as e:
         print(f"❌ Firestore Error: Failed to update case {case_id}. Error: {e}")
         return f"Error updating case: {e}"
 
+def get_patient_emails(case_ids: list):
+    """
+    Retrieves the patient emails for many cases with a single batched read.
+    Returns {case_id: email} for the cases that exist, or None if the read failed.
+    """
+    if not case_ids:
+        return {}
+    try:
+        db = get_db()
+        case_refs = [db.collection("cases").document(case_id) for case_id in case_ids]
+        with external_call("firestore", "get_all_cases"):
+            case_docs = list(db.get_all(case_refs, field_paths=["patientEmail"]))
+        return {doc.id: (doc.to_dict() or {}).get("patientEmail") for doc in case_docs if doc.exists}
+    except Exception as e:
+        print(f"❌ Firestore Error: Failed to retrieve patient emails for {len(case_ids)} case(s). Error: {e}")
+        return None
+
 def get_patient_email(case_id: str):
     """
     Retrieves the patient's email for a given case ID.
     """
     try:
-        db = firestore.client()
+        db = get_db()
         case_ref = db.collection("cases").document(case_id)
-        case_doc = case_ref.get()
+        with external_call("firestore", "get_case"):
+            case_doc = case_ref.get()
         if case_doc.exists:
             return case_doc.to_dict().get("patientEmail")
         else:
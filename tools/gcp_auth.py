@@ -1,4 +1,6 @@
-import os.path
+import os
+import threading
+from datetime import datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -6,28 +8,48 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 # Define the scopes required for our application
 SCOPES = ["https://www.googleapis.com/auth/gmail.send", "https://www.googleapis.com/auth/calendar.events"]
 
+# Refresh the access token this long before it actually expires
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Credentials are held in memory for the whole process. The lock serialises
+# refresh-and-persist so concurrent workers never race on token.json.
+_creds = None
+_creds_lock = threading.Lock()
+
+def _needs_refresh(creds) -> bool:
+    if not creds.valid:
+        return True
+    # google-auth stores expiry as a naive UTC datetime
+    return creds.expiry is not None and creds.expiry - datetime.utcnow() < REFRESH_MARGIN
+
 def get_gcp_credentials():
     """
     Handles Google Cloud Platform authentication.
+    - Keeps credentials in memory and refreshes them shortly before expiry.
     - Manages token creation, storage, and refresh.
     - Requires a one-time user authentication via browser on first run.
     """
-    creds = None
-    # The file token.json stores the user's access and refresh tokens.
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # This will start the browser-based authentication flow
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    
-    return creds
+    global _creds
+    with _creds_lock:
+        creds = _creds
+        # The file token.json stores the user's access and refresh tokens.
+        if creds is None and os.path.exists("token.json"):
+            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+
+        # If there are no (valid) credentials available, let the user log in.
+        if not creds or _needs_refresh(creds):
+            if creds and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                # This will start the browser-based authentication flow
+                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+                creds = flow.run_local_server(port=0)
+
+            # Save the credentials for the next run. Other worker processes may
+            # read token.json at any time, so replace it atomically.
+            with open(f"token.json.{os.getpid()}", "w") as token:
+                token.write(creds.to_json())
+            os.replace(f"token.json.{os.getpid()}", "token.json")
+
+        _creds = creds
+        return creds
@@ -0,0 +1,187 @@
+import base64
+import os
+import time
+from urllib.parse import quote
+import google_crc32c
+import requests
+import firebase_admin
+from google.auth.transport.requests import AuthorizedSession
+from dotenv import load_dotenv
+from .metrics import external_call
+
+load_dotenv()
+
+# GCS requires every non-final chunk of a resumable upload to be a multiple of 256 KiB
+_CHUNK_ALIGNMENT = 256 * 1024
+GCS_UPLOAD_CHUNK_SIZE = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+GCS_UPLOAD_MAX_RETRIES = int(os.getenv("GCS_UPLOAD_MAX_RETRIES", "5"))
+# Points the uploader at a local fake GCS server (e.g. fake-gcs-server) instead of Google
+STORAGE_EMULATOR_HOST = os.getenv("STORAGE_EMULATOR_HOST")
+
+_RETRIABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+if GCS_UPLOAD_CHUNK_SIZE % _CHUNK_ALIGNMENT:
+    raise ValueError("GCS_UPLOAD_CHUNK_SIZE must be a multiple of 256 KiB.")
+
+def _api_base() -> str:
+    if STORAGE_EMULATOR_HOST:
+        host = STORAGE_EMULATOR_HOST
+        return host if host.startswith("http") else f"http://{host}"
+    return "https://storage.googleapis.com"
+
+def _http_session():
+    if STORAGE_EMULATOR_HOST:
+        return requests.Session()
+    # The Firebase Admin credential is already scoped for devstorage.read_write
+    return AuthorizedSession(firebase_admin.get_app().credential.get_credential())
+
+class UploadError(Exception):
+    pass
+
+class UploadTooLarge(UploadError):
+    """
+    The streamed file went over the caller's size limit.
+    """
+
+class ResumableUploadSession:
+    """
+    Streams an object into GCS through a resumable upload session.
+    Bytes are appended as they arrive and sent in `chunk_size` pieces, so at
+    most one chunk is held in memory. A CRC32C checksum is computed on the
+    fly and verified against the stored object. If a chunk request fails,
+    the session asks GCS how much it persisted and resumes from there.
+    Resuming is only a retry within one request: a client whose request
+    drops starts a new upload.
+    """
+
+    def __init__(self, session_url: str, chunk_size: int = GCS_UPLOAD_CHUNK_SIZE, http=None):
+        self.session_url = session_url
+        self.chunk_size = chunk_size
+        self.http = http or _http_session()
+        self.offset = 0             # bytes GCS has confirmed
+        self.crc32c = 0             # running checksum of every byte appended
+        self.size = 0               # bytes appended so far
+        self._buffer = bytearray()
+
+    @classmethod
+    def start(cls, bucket_name: str, object_name: str, content_type: str = "application/octet-stream",
+              chunk_size: int = GCS_UPLOAD_CHUNK_SIZE):
+        http = _http_session()
+        with external_call("gcs", "start_resumable_upload"):
+            response = http.post(
+                f"{_api_base()}/upload/storage/v1/b/{quote(bucket_name, safe='')}/o",
+                params={"uploadType": "resumable", "name": object_name},
+                json={"name": object_name, "contentType": content_type},
+                headers={"X-Upload-Content-Type": content_type},
+            )
+        if response.status_code != 200:
+            raise UploadError(f"Failed to start resumable upload: {response.status_code} {response.text}")
+        return cls(response.headers["Location"], chunk_size=chunk_size, http=http)
+
+    def query_offset(self) -> int:
+        """
+        Asks GCS how many bytes of this session it has persisted.
+        """
+        with external_call("gcs", "query_upload_status"):
+            response = self.http.put(self.session_url, headers={"Content-Range": "bytes */*", "Content-Length": "0"})
+        if response.status_code in (200, 201):
+            return int(response.json()["size"])
+        if response.status_code != 308:
+            raise UploadError(f"Failed to query upload status: {response.status_code} {response.text}")
+        persisted = response.headers.get("Range")
+        return int(persisted.rsplit("-", 1)[1]) + 1 if persisted else 0
+
+    def append(self, data: bytes):
+        """
+        Buffers `data` and folds it into the checksum. Cheap enough to call
+        from the event loop; network I/O only happens in flush()/finish().
+        """
+        self._buffer += data
+        self.crc32c = google_crc32c.extend(self.crc32c, data)
+        self.size += len(data)
+
+    def ready(self) -> bool:
+        return len(self._buffer) >= self.chunk_size
+
+    def flush(self):
+        """
+        Sends every complete chunk currently buffered.
+        """
+        while len(self._buffer) >= self.chunk_size:
+            self._send(self.chunk_size, final=False)
+
+    def finish(self) -> dict:
+        """
+        Sends the final chunk and returns the stored object's metadata after
+        checking its size and CRC32C against what was streamed.
+        """
+        self.flush()
+        resource = self._send(len(self._buffer), final=True)
+        if int(resource["size"]) != self.size or resource.get("crc32c") != self.crc32c_base64():
+            raise UploadError(
+                f"Uploaded object does not match the stream (size {resource['size']} vs {self.size}, "
+                f"crc32c {resource.get('crc32c')} vs {self.crc32c_base64()})."
+            )
+        return resource
+
+    def cancel(self):
+        """
+        Abandons the session so GCS discards the bytes sent so far.
+        """
+        self._buffer.clear()
+        with external_call("gcs", "cancel_upload"):
+            response = self.http.delete(self.session_url)
+        # GCS answers a cancelled session with 499
+        if response.status_code not in (204, 499):
+            raise UploadError(f"Failed to cancel upload: {response.status_code} {response.text}")
+
+    def crc32c_base64(self) -> str:
+        return base64.b64encode(self.crc32c.to_bytes(4, "big")).decode()
+
+    def _send(self, length: int, final: bool):
+        attempt = 0
+        while True:
+            start = self.offset
+            chunk = bytes(memoryview(self._buffer)[:length])
+            headers = {"Content-Length": str(len(chunk))}
+            total = str(self.size) if final else "*"
+            if chunk:
+                headers["Content-Range"] = f"bytes {start}-{start + len(chunk) - 1}/{total}"
+            else:
+                headers["Content-Range"] = f"bytes */{total}"
+            if final:
+                headers["X-Goog-Hash"] = f"crc32c={self.crc32c_base64()}"
+            try:
+                with external_call("gcs", "upload_chunk"):
+                    response = self.http.put(self.session_url, data=chunk, headers=headers)
+                status = response.status_code
+            except requests.RequestException as e:
+                response, status = None, None
+                error = e
+            if status in (200, 201) and final:
+                self._confirm(length)
+                return response.json()
+            if status == 308 and not final:
+                persisted = response.headers.get("Range")
+                confirmed = int(persisted.rsplit("-", 1)[1]) + 1 if persisted else start
+                self._confirm(confirmed - start)
+                length -= confirmed - start
+                if length == 0:
+                    return None
+                if confirmed > start:
+                    # GCS kept only part of the chunk; send the remainder
+                    continue
+            elif status is not None and status not in _RETRIABLE_STATUSES:
+                raise UploadError(f"Chunk upload failed: {status} {response.text}")
+            attempt += 1
+            if attempt > GCS_UPLOAD_MAX_RETRIES:
+                raise UploadError(f"Chunk upload failed after {GCS_UPLOAD_MAX_RETRIES} retries: {status or error}")
+            time.sleep(min(30, 2 ** attempt))
+            # Resume from whatever GCS actually persisted before the failure
+            persisted = self.query_offset()
+            self._confirm(persisted - start)
+            length -= persisted - start
+
+    def _confirm(self, length: int):
+        del self._buffer[:length]
+        self.offset += length
@@ -0,0 +1,66 @@
+import os
+import threading
+from google.auth.credentials import AnonymousCredentials
+from dotenv import load_dotenv
+from .gcp_auth import get_gcp_credentials
+
+load_dotenv()
+
+# Sends Gmail and Calendar calls to a stand-in server instead of Google,
+# e.g. benchmarks/fake_google_apis.py. Requests are then unauthenticated.
+GOOGLE_API_ROOT_URL = os.getenv("GOOGLE_API_ROOT_URL")
+
+_anonymous_credentials = AnonymousCredentials()
+
+# Parsed discovery documents, shared by every thread in the process
+_discovery_docs = {}
+_discovery_lock = threading.Lock()
+
+# httplib2 connections are not thread-safe, so each thread keeps its own
+# built service objects (built from the shared discovery document).
+_local = threading.local()
+
+def _discovery_doc(api: str, version: str):
+    # googleapiclient is slow to import, so it is loaded with the first service
+    from googleapiclient.discovery import build
+    key = (api, version)
+    with _discovery_lock:
+        if key not in _discovery_docs:
+            # Only the bundled discovery document is kept, so no real credentials are needed
+            service = build(api, version, credentials=_anonymous_credentials, cache_discovery=False)
+            doc = service._rootDesc
+            if GOOGLE_API_ROOT_URL:
+                # rootUrl is used for both method URLs and the batch endpoint
+                doc = {**doc, "rootUrl": GOOGLE_API_ROOT_URL.rstrip("/") + "/"}
+            _discovery_docs[key] = doc
+        return _discovery_docs[key]
+
+def _credentials():
+    return _anonymous_credentials if GOOGLE_API_ROOT_URL else get_gcp_credentials()
+
+def get_service(api: str, version: str):
+    """
+    Returns a cached Google API service object (e.g. "gmail", "v1") for the
+    calling thread. Rebuilt only when the in-memory credentials are replaced.
+    """
+    creds = _credentials()
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+
+    cached = services.get((api, version))
+    if cached is not None and cached[0] is creds:
+        return cached[1]
+
+    from googleapiclient.discovery import build_from_document
+    service = build_from_document(_discovery_doc(api, version), credentials=creds)
+    services[(api, version)] = (creds, service)
+    return service
+
+def preload_discovery_docs():
+    """
+    Parses the Gmail and Calendar discovery documents ahead of the first
+    notification. Used by the API's startup warm-up.
+    """
+    for api, version in (("gmail", "v1"), ("calendar", "v3")):
+        _discovery_doc(api, version)
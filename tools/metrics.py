@@ -0,0 +1,162 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Request id of the HTTP request (or review job) currently being handled
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+trace_logger = logging.getLogger("stenosis.trace")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram with fixed buckets and labels.
+    An observation is one bisect and a few additions under a lock.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(series_items):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "stenosis_http_request_duration_seconds", "Latency of API requests.", ("method", "route", "status")
+)
+NODE_SECONDS = Histogram(
+    "stenosis_workflow_node_duration_seconds", "Latency of review workflow nodes.", ("node", "outcome")
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "stenosis_external_call_duration_seconds",
+    "Latency of calls to Firestore, Cloud Storage, Gmail and Calendar.",
+    ("service", "operation", "outcome"),
+)
+
+_HISTOGRAMS = [HTTP_REQUEST_SECONDS, NODE_SECONDS, EXTERNAL_CALL_SECONDS]
+
+def render_prometheus() -> str:
+    """
+    Renders every histogram in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+def _log_span(kind: str, duration: float, outcome: str, labels: dict):
+    if trace_logger.isEnabledFor(logging.DEBUG):
+        trace_logger.debug(json.dumps({
+            "span": kind,
+            "request_id": request_id_var.get(),
+            "duration_ms": round(duration * 1000, 3),
+            "outcome": outcome,
+            **labels,
+        }))
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """
+    Times one call to an external service. Exceptions are recorded with
+    outcome="error" and re-raised.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        EXTERNAL_CALL_SECONDS.observe(duration, service=service, operation=operation, outcome=outcome)
+        _log_span("external_call", duration, outcome, {"service": service, "operation": operation})
+
+def traced(service: str, operation: str = None):
+    """
+    Decorator form of external_call for sync and async functions.
+    """
+    def decorator(func):
+        name = operation or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with external_call(service, name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with external_call(service, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_node(name: str, func):
+    """
+    Wraps a LangGraph node so each run records a timing span and carries
+    the request id from the workflow state into the node's log lines.
+    """
+    @functools.wraps(func)
+    def wrapper(state):
+        token = request_id_var.set(state.get("request_id") or request_id_var.get())
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return func(state)
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            NODE_SECONDS.observe(duration, node=name, outcome=outcome)
+            _log_span("workflow_node", duration, outcome, {"node": name, "case_id": state.get("case_id")})
+            request_id_var.reset(token)
+    return wrapper
+
+def observe_http_request(method: str, route: str, status: int, duration: float):
+    HTTP_REQUEST_SECONDS.observe(duration, method=method, route=route, status=status)
+    _log_span("http_request", duration, "ok" if status < 500 else "error", {"method": method, "route": route, "status": status})
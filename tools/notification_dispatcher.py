@@ -0,0 +1,166 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from functools import partial
+from googleapiclient.errors import HttpError
+from dotenv import load_dotenv
+from .google_clients import get_service
+from .gmail_tool import build_email_message
+from .calendar_tool import build_appointment_event
+from .metrics import external_call
+
+load_dotenv()
+
+# How long to collect outgoing notifications before sending a batch
+NOTIFY_BATCH_WINDOW_SECONDS = float(os.getenv("NOTIFY_BATCH_WINDOW_SECONDS", "0.25"))
+# Gmail and Calendar both accept up to 100 calls per batch; Google recommends 50 for Gmail
+NOTIFY_BATCH_MAX_SIZE = int(os.getenv("NOTIFY_BATCH_MAX_SIZE", "50"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "3"))
+NOTIFY_RESULT_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_RESULT_TIMEOUT_SECONDS", "120"))
+
+_RETRIABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class _Notification:
+    def __init__(self, api: str, version: str, make_request):
+        self.api = api
+        self.version = version
+        self.make_request = make_request
+        self.future = Future()
+        self.attempts = 0
+        self.not_before = 0.0
+
+class NotificationDispatcher:
+    """
+    Collects Gmail sends and Calendar inserts over a short window and sends
+    them as Google API batch requests, one batch per API.
+    Each submitted call gets its own Future. Items that fail with a
+    retriable error (rate limit, 5xx) are re-queued with backoff while the
+    rest of the batch completes. Cancelling a Future (as the dispatch_*
+    helpers do on timeout) drops its call unless it is already in flight.
+    """
+
+    def __init__(self, window: float = NOTIFY_BATCH_WINDOW_SECONDS, max_batch: int = NOTIFY_BATCH_MAX_SIZE,
+                 max_attempts: int = NOTIFY_MAX_ATTEMPTS):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, api: str, version: str, make_request) -> Future:
+        """
+        Queues `make_request(service)`, which must return an unexecuted
+        HttpRequest for the given API, and returns a Future for its response.
+        """
+        item = _Notification(api, version, make_request)
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+            self._pending.append(item)
+            self._cond.notify()
+        return item.future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let concurrent reviews add to this batch before sending it
+            time.sleep(self.window)
+            with self._cond:
+                now = time.monotonic()
+                self._pending = [item for item in self._pending if not item.future.cancelled()]
+                ready = [item for item in self._pending if item.not_before <= now]
+                self._pending = [item for item in self._pending if item.not_before > now]
+            by_api = {}
+            for item in ready:
+                by_api.setdefault((item.api, item.version), []).append(item)
+            for (api, version), items in by_api.items():
+                for i in range(0, len(items), self.max_batch):
+                    self._send_batch(api, version, items[i:i + self.max_batch])
+
+    def _send_batch(self, api: str, version: str, items):
+        items = [item for item in items if not item.future.cancelled()]
+        if not items:
+            return
+        for item in items:
+            item.attempts += 1
+        try:
+            service = get_service(api, version)
+            batch = service.new_batch_http_request()
+            for i, item in enumerate(items):
+                batch.add(item.make_request(service), callback=partial(self._on_result, item), request_id=str(i))
+            with external_call(api, "batch"):
+                batch.execute()
+            print(f"✅ Dispatcher: Sent {api} batch of {len(items)} request(s)")
+        except Exception as e:
+            # The whole batch request failed, so every item gets another attempt
+            print(f"❌ Dispatcher Error: {api} batch of {len(items)} failed. Error: {e}")
+            for item in items:
+                if not item.future.done():
+                    self._retry_or_fail(item, e)
+
+    def _on_result(self, item: _Notification, request_id, response, exception):
+        if exception is None:
+            self._settle(item.future.set_result, response)
+        else:
+            self._retry_or_fail(item, exception)
+
+    @staticmethod
+    def _settle(set_outcome, value):
+        # The caller may have cancelled the Future while its batch was in flight
+        try:
+            set_outcome(value)
+        except InvalidStateError:
+            pass
+
+    def _retry_or_fail(self, item: _Notification, exception: Exception):
+        if item.future.cancelled():
+            return
+        retriable = not isinstance(exception, HttpError) or exception.resp.status in _RETRIABLE_STATUSES
+        if retriable and item.attempts < self.max_attempts:
+            delay = min(30, 2 ** item.attempts) * random.uniform(0.5, 1.0)
+            item.not_before = time.monotonic() + delay
+            with self._cond:
+                self._pending.append(item)
+                self._cond.notify()
+        else:
+            self._settle(item.future.set_exception, exception)
+
+# Process-wide dispatcher shared by all workflow runs
+dispatcher = NotificationDispatcher()
+
+def dispatch_notification_email(recipient_email: str, subject: str, body: str):
+    """
+    Sends an email through the batching dispatcher and waits for its result.
+    """
+    message = build_email_message(recipient_email, subject, body)
+    future = dispatcher.submit("gmail", "v1", lambda service: service.users().messages().send(userId="me", body=message))
+    try:
+        send_message = future.result(timeout=NOTIFY_RESULT_TIMEOUT_SECONDS)
+        print(f"✅ Gmail: Successfully sent email to {recipient_email}. Message ID: {send_message['id']}")
+        return f"Email sent successfully to {recipient_email}"
+    except Exception as e:
+        # After a timeout the workflow treats the send as failed, so it must not go out later
+        future.cancel()
+        print(f"❌ Gmail Error: Failed to send email. Error: {e}")
+        return f"Error sending email: {e}"
+
+def dispatch_appointment_event(patient_email: str, title: str = "Follow-up Appointment for Stenosis Review"):
+    """
+    Creates a calendar event through the batching dispatcher and waits for its result.
+    """
+    event = build_appointment_event(patient_email, title)
+    future = dispatcher.submit("calendar", "v3", lambda service: service.events().insert(calendarId="primary", body=event))
+    try:
+        created_event = future.result(timeout=NOTIFY_RESULT_TIMEOUT_SECONDS)
+        print(f"✅ Calendar: Successfully created event. Event ID: {created_event.get('htmlLink')}")
+        return f"Calendar event created successfully for {patient_email}"
+    except Exception as e:
+        future.cancel()
+        print(f"❌ Calendar Error: Failed to create event. Error: {e}")
+        return f"Error creating calendar event: {e}"
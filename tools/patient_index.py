@@ -0,0 +1,180 @@
+import bisect
+import heapq
+import os
+import threading
+from dotenv import load_dotenv
+from .data_access import get_db, decode_page_token, encode_page_token
+from .snapshot_listener import SnapshotListener, LISTENER_HEALTH_CHECK_SECONDS
+
+load_dotenv()
+
+PATIENT_INDEX_ENABLED = os.getenv("PATIENT_INDEX_ENABLED", "true").lower() == "true"
+
+# Sorts after every character a real name or email contains, so it bounds prefix ranges
+_PREFIX_END = "\U0010ffff"
+
+def _fold(value: str) -> str:
+    # Reuse the original string when it is already folded (most emails), which saves memory
+    folded = value.casefold()
+    return value if folded == value else folded
+
+class PatientIndex:
+    """
+    In-memory index of patients (users with role "patient" and both a name
+    and an email), kept current by a Firestore on_snapshot listener and by
+    /register in this process.
+    - Patients are kept as uid -> (name, email) plus three sorted lists of
+      (key, uid): by name, by folded name and by folded email. Paging is a
+      bisect and a slice. A prefix search bisects to the matching ranges
+      of the folded lists and merges them lazily, so a page costs the same
+      however many patients match.
+    - Pages are ordered by (name, uid) and use the same token format as
+      data_access.list_patients, so a client can move between the two.
+      Search results are ordered by the matching folded name or email,
+      then uid.
+    - `page()` returns None while the index is not in sync (before the
+      first snapshot or after the listener drops).
+    """
+
+    def __init__(self, health_check_interval: float = LISTENER_HEALTH_CHECK_SECONDS):
+        self._patients = {}
+        self._by_name = []
+        self._by_folded_name = []
+        self._by_folded_email = []
+        self._lock = threading.Lock()
+        self._ready = False
+        self.listener = SnapshotListener(
+            "patient-index",
+            lambda: get_db().collection("users").where("role", "==", "patient"),
+            self._on_snapshot,
+            on_disconnect=self._on_disconnect,
+            health_check_interval=health_check_interval,
+        )
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        self.listener.stop()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def _on_disconnect(self):
+        with self._lock:
+            self._ready = False
+
+    def _on_snapshot(self, docs, changes, first: bool):
+        with self._lock:
+            if first:
+                self._rebuild((doc.id, doc.to_dict()) for doc in docs)
+                self._ready = True
+                print(f"✅ Patient Index: Synced {len(self._patients)} patient(s) from Firestore")
+                return
+            for change in changes:
+                data = None if change.type.name == "REMOVED" else change.document.to_dict()
+                self._apply(change.document.id, data)
+
+    def apply(self, uid: str, profile):
+        """
+        Adds, updates or removes one user after a write in this process,
+        without waiting for the listener to deliver it.
+        """
+        with self._lock:
+            self._apply(uid, profile)
+
+    def _rebuild(self, users):
+        # Sorting once is much faster than inserting 100k patients one by one
+        self._patients = {}
+        for uid, data in users:
+            entry = self._entry(data)
+            if entry is not None:
+                self._patients[uid] = entry
+        self._by_name = sorted((name, uid) for uid, (name, _) in self._patients.items())
+        self._by_folded_name = sorted((_fold(name), uid) for uid, (name, _) in self._patients.items())
+        self._by_folded_email = sorted((_fold(email), uid) for uid, (_, email) in self._patients.items())
+
+    @staticmethod
+    def _entry(data):
+        # Same filter as the Firestore listing: patients with a name and an email
+        if not data or data.get("role") != "patient":
+            return None
+        name, email = data.get("name"), data.get("email")
+        if not isinstance(name, str) or not isinstance(email, str):
+            return None
+        return name, email
+
+    def _apply(self, uid: str, data):
+        previous = self._patients.pop(uid, None)
+        if previous is not None:
+            name, email = previous
+            for keys, key in ((self._by_name, name), (self._by_folded_name, _fold(name)), (self._by_folded_email, _fold(email))):
+                del keys[bisect.bisect_left(keys, (key, uid))]
+        entry = self._entry(data)
+        if entry is not None:
+            name, email = entry
+            self._patients[uid] = entry
+            bisect.insort(self._by_name, (name, uid))
+            bisect.insort(self._by_folded_name, (_fold(name), uid))
+            bisect.insort(self._by_folded_email, (_fold(email), uid))
+
+    def _search(self, prefix: str, after, limit: int) -> list:
+        """
+        Returns up to `limit` (folded key, uid) pairs of patients whose name
+        or email starts with `prefix`, ignoring case, that sort after the
+        `after` pair. A patient matching on both is listed under its name.
+        """
+        prefix = _fold(prefix)
+        low, high = (prefix,), (prefix + _PREFIX_END,)
+
+        def matches(keys, emails: bool):
+            start = bisect.bisect_left(keys, low)
+            if after:
+                start = max(start, bisect.bisect_right(keys, after))
+            return ((*keys[i], emails) for i in range(start, bisect.bisect_left(keys, high)))
+
+        selected = []
+        for key, uid, emails in heapq.merge(matches(self._by_folded_name, False), matches(self._by_folded_email, True)):
+            # Duplicates sort close together, since names and emails tend to share a prefix
+            if emails and _fold(self._patients[uid][0]).startswith(prefix):
+                continue
+            selected.append((key, uid))
+            if len(selected) == limit:
+                break
+        return selected
+
+    def page(self, page_size: int, page_token=None, query: str = None):
+        """
+        Returns ([{"uid", "name", "email", "role"}], next_page_token) ordered
+        by name, or by the matching name or email when limited to a prefix
+        with `query`, or None if the index cannot answer right now.
+        """
+        after = decode_page_token(page_token) if page_token else None
+        if after and not isinstance(after[0], str):
+            raise ValueError("Invalid page token.")
+        with self._lock:
+            if not self._ready:
+                return None
+            if query:
+                # One extra match tells us whether another page exists
+                selected = self._search(query, after, page_size + 1)
+                more = len(selected) > page_size
+                selected = selected[:page_size]
+            else:
+                start = bisect.bisect_right(self._by_name, after) if after else 0
+                selected = self._by_name[start:start + page_size]
+                more = start + page_size < len(self._by_name)
+            patients = [(uid, self._patients[uid]) for _, uid in selected]
+
+        next_page_token = encode_page_token(*selected[-1]) if more and selected else None
+        patient_list = [{"uid": uid, "name": name, "email": email, "role": "patient"} for uid, (name, email) in patients]
+        return patient_list, next_page_token
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "restarts": self.listener.restarts,
+                "patients": len(self._patients),
+            }
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from .shared_state import shared_store
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Sustained requests per minute per clinic, and how many may arrive at once
+RATE_LIMIT_CASES_PER_MINUTE = float(os.getenv("RATE_LIMIT_CASES_PER_MINUTE", "60"))
+RATE_LIMIT_CASES_BURST = float(os.getenv("RATE_LIMIT_CASES_BURST", "20"))
+RATE_LIMIT_REVIEWS_PER_MINUTE = float(os.getenv("RATE_LIMIT_REVIEWS_PER_MINUTE", "120"))
+RATE_LIMIT_REVIEWS_BURST = float(os.getenv("RATE_LIMIT_REVIEWS_BURST", "30"))
+# The bulk endpoints take one token per item from their own buckets, whose
+# burst bounds how many items one bulk request may hold
+RATE_LIMIT_BULK_CASES_PER_MINUTE = float(os.getenv("RATE_LIMIT_BULK_CASES_PER_MINUTE", "600"))
+RATE_LIMIT_BULK_CASES_BURST = float(os.getenv("RATE_LIMIT_BULK_CASES_BURST", "500"))
+RATE_LIMIT_BULK_REVIEWS_PER_MINUTE = float(os.getenv("RATE_LIMIT_BULK_REVIEWS_PER_MINUTE", "300"))
+RATE_LIMIT_BULK_REVIEWS_BURST = float(os.getenv("RATE_LIMIT_BULK_REVIEWS_BURST", "100"))
+# Buckets remembered per process when there is no shared store
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key (a clinic), refilled at `per_minute` tokens
+    per minute up to `burst`. Each request takes a token (bulk requests one
+    per item, so a bulk request may hold at most `burst` items), so one
+    clinic's burst is cut off without affecting the others.
+    With a `shared` store the buckets live in SQLite and the limit holds
+    across all worker processes; otherwise they are kept in memory.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: float, shared=None):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.shared = shared
+        self._buckets = LRUCache(maxsize=RATE_LIMIT_MAX_KEYS)
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "limited": 0}
+
+    def acquire(self, key: str, cost: int = 1) -> float:
+        """
+        Takes `cost` tokens. Returns 0 if the request may proceed, otherwise
+        the seconds to wait. Blocking when the buckets are shared, so call it
+        off the event loop. A cost above `burst` can never be granted, so
+        callers reject such requests instead of calling this.
+        """
+        if self.shared is not None:
+            retry_after = self.shared.take_token(f"{self.name}:{key}", self.rate, self.burst, cost)
+        else:
+            retry_after = self._take_local(key, cost)
+        with self._lock:
+            self._counters["limited" if retry_after else "allowed"] += 1
+        return retry_after
+
+    def _take_local(self, key: str, cost: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            retry_after = 0.0 if tokens >= cost else (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost if not retry_after else tokens, now)
+            return retry_after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "perMinute": self.rate * 60,
+                "burst": self.burst,
+                "backend": "memory" if self.shared is None else "sqlite",
+            }
+
+def clinic_key(user: dict) -> str:
+    """
+    The rate-limit key for a user: the profile's `clinicId` when accounts of
+    one clinic are grouped, otherwise the account's own uid.
+    """
+    return user.get("clinicId") or user["uid"]
+
+case_upload_limiter = TokenBucketLimiter("cases", RATE_LIMIT_CASES_PER_MINUTE, RATE_LIMIT_CASES_BURST, shared_store)
+review_limiter = TokenBucketLimiter("reviews", RATE_LIMIT_REVIEWS_PER_MINUTE, RATE_LIMIT_REVIEWS_BURST, shared_store)
+bulk_case_limiter = TokenBucketLimiter("bulk_cases", RATE_LIMIT_BULK_CASES_PER_MINUTE, RATE_LIMIT_BULK_CASES_BURST, shared_store)
+bulk_review_limiter = TokenBucketLimiter("bulk_reviews", RATE_LIMIT_BULK_REVIEWS_PER_MINUTE, RATE_LIMIT_BULK_REVIEWS_BURST, shared_store)
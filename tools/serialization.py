@@ -0,0 +1,106 @@
+import gzip
+import os
+from datetime import datetime, timezone
+import orjson
+from dotenv import load_dotenv
+from starlette.responses import Response
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+load_dotenv()
+
+# Bodies smaller than this are sent uncompressed
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def timestamp_to_api(value: datetime) -> dict:
+    """
+    Converts a Firestore timestamp to {_seconds, _nanoseconds} with integer
+    math, so nanoseconds are exact rather than rounded through a float.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    # DatetimeWithNanoseconds keeps the full nanosecond value from Firestore
+    nanos = getattr(value, "nanosecond", None) or delta.microseconds * 1000
+    return {'_seconds': delta.days * 86400 + delta.seconds, '_nanoseconds': nanos}
+
+def format_created_at(data: dict) -> dict:
+    """
+    Returns a copy of a case with `createdAt` as {_seconds, _nanoseconds}.
+    """
+    data = dict(data)
+    if isinstance(data.get('createdAt'), datetime):
+        data['createdAt'] = timestamp_to_api(data['createdAt'])
+    return data
+
+def cases_to_api(cases) -> list:
+    """
+    Converts (case_id, data) pairs from data_access into the API's case
+    shape in a single pass: {"id": ..., **data} with createdAt formatted.
+    """
+    result = []
+    append = result.append
+    for case_id, data in cases:
+        item = {"id": case_id, **data}
+        created_at = item.get('createdAt')
+        if isinstance(created_at, datetime):
+            item['createdAt'] = timestamp_to_api(created_at)
+        append(item)
+    return result
+
+def _default(value):
+    # Anything orjson does not know natively, e.g. DatetimeWithNanoseconds outside createdAt
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def encode_json(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+def negotiate_encoding(accept_encoding: str):
+    """
+    Picks zstd or gzip from an Accept-Encoding header, or None for identity.
+    Codings with q=0 are treated as refused.
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if zstandard is not None and "zstd" in accepted:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=RESPONSE_ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+
+def json_response(content, accept_encoding: str = "", headers: dict = None, status_code: int = 200) -> Response:
+    """
+    Serializes `content` with orjson and compresses it with zstd or gzip
+    when the client accepts it and the body is worth compressing.
+    """
+    body = encode_json(content)
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+import orjson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# SQLite file shared by every worker process on the host (see Dockerfile).
+# Unset keeps caches and rate limits in-process, as with a single worker.
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB")
+# Expired cache rows are deleted every this many writes
+SHARED_STATE_PRUNE_EVERY = int(os.getenv("SHARED_STATE_PRUNE_EVERY", "1000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expires_at);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class SharedStore:
+    """
+    Key-value cache and token buckets in a SQLite file, so that worker
+    processes share them.
+    - WAL mode lets reads proceed while another process writes.
+    - Expiry uses wall-clock time, which all processes agree on.
+    - Each thread keeps its own connection. Opening one per call, as the
+      review queue does, costs about 20x a cached read, and auth lookups
+      run on every request.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # Durability is not needed for a cache; skip the fsync on every commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, namespace: str, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value, ttl: float):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, orjson.dumps(value, default=str), now + ttl),
+        )
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % SHARED_STATE_PRUNE_EVERY == 0
+        if prune:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def take(self, namespace: str, key: str):
+        """
+        Returns and deletes an entry in one step, so only one caller gets it.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return orjson.loads(row[0]) if row else None
+
+    def delete(self, namespace: str, key: str):
+        self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def count(self, namespace: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?", (namespace, time.time())
+        ).fetchone()[0]
+
+    def take_token(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """
+        Takes `cost` tokens from the bucket `key`, which refills at `rate`
+        tokens per second up to `burst`. Returns 0 if they were taken,
+        otherwise the seconds until enough are available.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            retry_after = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not retry_after:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+            return retry_after
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+# Process-wide handle, or None when state stays in-process
+shared_store = SharedStore(SHARED_STATE_DB) if SHARED_STATE_DB else None
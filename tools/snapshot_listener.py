@@ -0,0 +1,123 @@
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How often the supervisor checks that a Firestore listener is still connected
+LISTENER_HEALTH_CHECK_SECONDS = float(os.getenv("LISTENER_HEALTH_CHECK_SECONDS", "5"))
+LISTENER_RESTART_BACKOFF_MAX_SECONDS = float(os.getenv("LISTENER_RESTART_BACKOFF_MAX_SECONDS", "60"))
+
+class SnapshotListener:
+    """
+    Keeps a Firestore on_snapshot listener running.
+    - `make_query()` is called on every (re)start, so it can move a cursor forward.
+    - `on_snapshot(docs, changes, first)` gets `first=True` for the initial
+      full result set of each new listener.
+    - `on_disconnect()` runs when the stream drops. A supervisor thread then
+      restarts the listener with exponential backoff.
+    - With a `refresh_interval`, a healthy listener is also replaced after
+      that many seconds. The new one is opened before the old one is closed,
+      so a query whose cursor moves forward stops tracking old documents.
+    Callbacks from a listener that has already been replaced are ignored.
+    """
+
+    def __init__(self, name: str, make_query, on_snapshot, on_disconnect=None,
+                 health_check_interval: float = LISTENER_HEALTH_CHECK_SECONDS, refresh_interval: float = None):
+        self.name = name
+        self.make_query = make_query
+        self.on_snapshot = on_snapshot
+        self.on_disconnect = on_disconnect
+        self.health_check_interval = health_check_interval
+        self.refresh_interval = refresh_interval
+        self.restarts = 0
+        self.refreshes = 0
+        self._watch = None
+        self._listening_since = 0.0
+        self._generation = 0
+        self._synced_generation = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._supervisor = None
+
+    def start(self):
+        self._stop.clear()
+        self._listen()
+        self._supervisor = threading.Thread(target=self._supervise, name=f"{self.name}-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join(self.health_check_interval + 1)
+            self._supervisor = None
+        self._unsubscribe()
+
+    @property
+    def is_active(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def _listen(self):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self._watch = self.make_query().on_snapshot(
+            lambda docs, changes, read_time: self._dispatch(generation, docs, changes)
+        )
+        self._listening_since = time.monotonic()
+
+    def _dispatch(self, generation: int, docs, changes):
+        with self._lock:
+            if generation != self._generation:
+                return
+            first = self._synced_generation != generation
+            self._synced_generation = generation
+        self.on_snapshot(docs, changes, first)
+
+    def _unsubscribe(self):
+        watch, self._watch = self._watch, None
+        with self._lock:
+            self._generation += 1
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"❌ Listener Error: Failed to close {self.name} listener. Error: {e}")
+
+    def _refresh(self):
+        old_watch = self._watch
+        try:
+            # Bumps the generation, so the old listener's callbacks are ignored from here on
+            self._listen()
+            self.refreshes += 1
+        except Exception as e:
+            print(f"❌ Listener Error: Failed to refresh {self.name} listener. Error: {e}")
+            return
+        try:
+            old_watch.unsubscribe()
+        except Exception as e:
+            print(f"❌ Listener Error: Failed to close {self.name} listener. Error: {e}")
+
+    def _supervise(self):
+        failures = 0
+        while not self._stop.wait(self.health_check_interval):
+            if self.is_active:
+                failures = 0
+                if self.refresh_interval and time.monotonic() - self._listening_since >= self.refresh_interval:
+                    self._refresh()
+                continue
+            print(f"--- {self.name} listener disconnected; restarting ---")
+            self._unsubscribe()
+            delay = min(LISTENER_RESTART_BACKOFF_MAX_SECONDS, 2 ** failures) * random.uniform(0.5, 1.0)
+            failures += 1
+            if self._stop.wait(delay):
+                break
+            try:
+                self._listen()
+                self.restarts += 1
+            except Exception as e:
+                print(f"❌ Listener Error: Failed to restart {self.name} listener. Error: {e}")
@@ -0,0 +1,111 @@
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Plain form fields are small; anything larger is rejected rather than buffered
+MAX_FIELD_SIZE = 64 * 1024
+
+class FormError(Exception):
+    pass
+
+class StreamingFormParser:
+    """
+    Incremental multipart/form-data parser for a single file upload.
+    Text fields are collected into `fields`; bytes of the `file_field` part
+    are handed back from feed() as they are parsed, so the file is never
+    spooled to memory or disk.
+    """
+
+    def __init__(self, content_type: str, file_field: str = "file"):
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or b"boundary" not in params:
+            raise FormError("Expected a multipart/form-data request.")
+        self.file_field = file_field
+        self.fields = {}
+        self.filename = None
+        self.file_content_type = "application/octet-stream"
+        self._file_chunks = []
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part_name = None
+        self._part_value = bytearray()
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, data: bytes):
+        """
+        Parses the next piece of the request body and returns the file
+        bytes it contained (possibly an empty list).
+        """
+        self._parser.write(data)
+        chunks, self._file_chunks = self._file_chunks, []
+        return chunks
+
+    def close(self):
+        self._parser.finalize()
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part_name = None
+        self._part_value = bytearray()
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode()
+        if self._part_name == self.file_field:
+            self.filename = options.get(b"filename", b"upload").decode()
+            if b"content-type" in self._headers:
+                self.file_content_type = self._headers[b"content-type"].decode()
+
+    def _on_part_data(self, data, start, end):
+        if self._part_name == self.file_field:
+            self._file_chunks.append(data[start:end])
+            return
+        if len(self._part_value) + end - start > MAX_FIELD_SIZE:
+            raise FormError(f"Form field '{self._part_name}' is too large.")
+        self._part_value += data[start:end]
+
+    def _on_part_end(self):
+        if self._part_name != self.file_field:
+            self.fields[self._part_name] = self._part_value.decode()
+
+class MultiFileFormParser(StreamingFormParser):
+    """
+    Variant of StreamingFormParser for batch uploads: every part named
+    `file_field` is a separate file. feed() returns (file_index, bytes)
+    pairs, and `files` lists each file's filename and content type in
+    the order they appeared.
+    """
+
+    def __init__(self, content_type: str, file_field: str = "files"):
+        super().__init__(content_type, file_field)
+        self.files = []
+
+    def _on_headers_finished(self):
+        self.file_content_type = "application/octet-stream"
+        super()._on_headers_finished()
+        if self._part_name == self.file_field:
+            self.files.append({"filename": self.filename, "contentType": self.file_content_type})
+
+    def _on_part_data(self, data, start, end):
+        if self._part_name == self.file_field:
+            self._file_chunks.append((len(self.files) - 1, data[start:end]))
+            return
+        super()._on_part_data(data, start, end)
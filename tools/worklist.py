@@ -0,0 +1,145 @@
+import bisect
+import os
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from .data_access import get_db, decode_page_token, encode_page_token
+from .serialization import format_created_at
+from .snapshot_listener import SnapshotListener, LISTENER_HEALTH_CHECK_SECONDS
+
+load_dotenv()
+
+# The review queues kept in memory, one per doctor role
+QUEUE_STATUSES = ["pending_junior_review", "pending_senior_review"]
+
+WORKLIST_VIEW_ENABLED = os.getenv("WORKLIST_VIEW_ENABLED", "true").lower() == "true"
+
+class _Queue:
+    """
+    One status queue: formatted cases by id plus their (createdAt, id) keys
+    kept sorted, so a page is a bisect and a slice.
+    """
+
+    def __init__(self):
+        self.cases = {}
+        self.sort_keys = {}
+        self.order = []
+
+    def upsert(self, case_id: str, data: dict):
+        self.remove(case_id)
+        created_at = data.get('createdAt')
+        # Firestore leaves out documents without the order_by field, so do the same
+        if not isinstance(created_at, datetime):
+            return
+        key = (created_at, case_id)
+        bisect.insort(self.order, key)
+        self.sort_keys[case_id] = key
+        self.cases[case_id] = format_created_at(data)
+
+    def remove(self, case_id: str):
+        key = self.sort_keys.pop(case_id, None)
+        if key is None:
+            return
+        index = bisect.bisect_left(self.order, key)
+        del self.order[index]
+        del self.cases[case_id]
+
+class WorklistView:
+    """
+    In-memory copy of the junior and senior review queues, kept current by a
+    Firestore on_snapshot listener on `cases` with status in QUEUE_STATUSES.
+    - Each snapshot applies only its added/modified/removed documents.
+    - `page()` returns None while the view is not known to be in sync (before
+      the first snapshot or after the listener drops), and callers then fall
+      back to querying Firestore.
+    - A dropped listener is restarted with backoff; the first snapshot of the
+      new listener replaces the whole view.
+    """
+
+    def __init__(self, statuses: list = QUEUE_STATUSES, health_check_interval: float = LISTENER_HEALTH_CHECK_SECONDS):
+        self.statuses = list(statuses)
+        self._queues = {status: _Queue() for status in self.statuses}
+        self._status_by_case = {}
+        self._lock = threading.Lock()
+        self._ready = False
+        self.listener = SnapshotListener(
+            "worklist",
+            lambda: get_db().collection("cases").where("status", "in", self.statuses),
+            self._on_snapshot,
+            on_disconnect=self._on_disconnect,
+            health_check_interval=health_check_interval,
+        )
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        self.listener.stop()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def _on_disconnect(self):
+        with self._lock:
+            self._ready = False
+
+    def _on_snapshot(self, docs, changes, first: bool):
+        with self._lock:
+            if first:
+                # Rebuild from the full result set of a new listener
+                self._queues = {status: _Queue() for status in self.statuses}
+                self._status_by_case = {}
+                for doc in docs:
+                    self._apply(doc.id, doc.to_dict())
+                self._ready = True
+                print(f"✅ Worklist: Synced {len(self._status_by_case)} queued case(s) from Firestore")
+                return
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    self._apply(change.document.id, None)
+                else:
+                    self._apply(change.document.id, change.document.to_dict())
+
+    def _apply(self, case_id: str, data):
+        previous = self._status_by_case.pop(case_id, None)
+        if previous is not None:
+            self._queues[previous].remove(case_id)
+        status = (data or {}).get("status")
+        if status in self._queues:
+            self._queues[status].upsert(case_id, data)
+            self._status_by_case[case_id] = status
+
+    def page(self, status: str, page_size: int, page_token=None, fields=None):
+        """
+        Returns ([{"id": ..., **case}], next_page_token) for `status`, newest
+        first, in the same order and token format as data_access.list_cases,
+        or None if the view cannot answer right now.
+        """
+        after = decode_page_token(page_token) if page_token else None
+        if after and not isinstance(after[0], datetime):
+            raise ValueError("Invalid page token.")
+        with self._lock:
+            if not self._ready or status not in self._queues:
+                return None
+            queue = self._queues[status]
+            end = bisect.bisect_left(queue.order, after) if after else len(queue.order)
+            start = max(0, end - page_size)
+            keys = queue.order[start:end][::-1]
+            cases = [(case_id, queue.cases[case_id]) for _, case_id in keys]
+
+        next_page_token = encode_page_token(*keys[-1]) if start > 0 and keys else None
+        case_list = []
+        for case_id, data in cases:
+            if fields:
+                data = {key: value for key, value in data.items() if key in fields}
+            case_list.append({"id": case_id, **data})
+        return case_list, next_page_token
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "restarts": self.listener.restarts,
+                **{status: len(queue.order) for status, queue in self._queues.items()},
+            }
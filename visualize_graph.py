@@ -1,9 +1,9 @@
 # backend/visualize_graph.py
 
-# This script imports your compiled graph and saves a visualization to a file.
-from graph.workflow import app
+# This script builds the workflow graph and saves a visualization to a file.
+from graph.workflow import build_workflow
 
 # This will generate a PNG image file in your backend directory
-app.get_graph().draw_png("workflow_graph.png")
+build_workflow().compile().get_graph().draw_png("workflow_graph.png")
 
 print("✅ Successfully generated workflow_graph.png")
\ No newline at end of file